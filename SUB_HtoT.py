@@ -4,9 +4,154 @@ July 2020
 A. Takken
 """
 
-from scipy.optimize import newton
+### The NIST (Shomate) enthalpy is inverted with a table per propellant and NIST segment (class Table), built once and
+### kept in "tables". Within a segment T(H) is a piecewise cubic Hermite interpolation with the exact slopes 1/cp;
+### the nodes are doubled until the error, checked against the exact enthalpy on a four times finer grid, is below "tol".
+### fun1 (scalar) and fun2 (arrays) have the same segment selection as the Newton solve in exact/exact2.
+
+import bisect
+import numpy as np
+from scipy.optimize import newton, brentq
+
+tables = {}                                 #[-], tables per propellant, see table()
 
 def fun1(NISTP,limitsP,MMP,H6,Tpi,TRAC):
+    return(table(NISTP,limitsP,MMP).fun1(H6,Tpi))
+
+
+def fun2(NISTP,limitsP,MMP,H6,Tpi,TRAC):
+    ### Vectorized version of fun1 for batch runs
+    # NISTP: array (N,7,3), limitsP: array (N,2+), MMP, H6, Tpi & TRAC: arrays (N,)
+    H6,Tpi = np.broadcast_arrays(np.asarray(H6,dtype=float),np.asarray(Tpi,dtype=float))
+    Tpo = np.empty(len(MMP))
+    for M in np.unique(MMP): #one table per propellant
+        s = MMP == M
+        j = np.flatnonzero(s)[0]
+        Tpo[s] = table(NISTP[j].tolist(),limitsP[j].tolist(),float(M)).fun2(H6[s],Tpi[s])
+    return(Tpo)
+
+
+def table(NISTP,limitsP,MMP):
+    ### Table of the propellant, from "tables" or built (key: molar mass, NIST limits and first coefficients)
+    key = (MMP,limitsP[0],limitsP[1],tuple(NISTP[0]))
+    tab = tables.get(key)
+    if tab is None:
+        tab = tables[key] = Table(NISTP,limitsP,MMP)
+    return(tab)
+
+
+def H(c,T,MMP):
+    ### NIST enthalpy [J/kg] of one segment (coefficients c), 0 at 298.15 K
+    t = T/1000
+    return (c[0]*t+c[1]*t**2/2+c[2]*t**3/3+c[3]*t**4/4-c[4]/t+c[5]-c[6])*1000/MMP
+
+
+def cp(c,T,MMP):
+    ### NIST specific heat [J/kg/K] of one segment (coefficients c), dH/dT
+    t = T/1000
+    return (c[0]+c[1]*t+c[2]*t**2+c[3]*t**3+c[4]/t**2)/MMP
+
+
+class Table:
+
+    def __init__(self,NISTP,limitsP,MMP,tol=1e-6,Tmin=200.0,Tmax=6000.0):
+        # tol [K]: maximum interpolation error, Tmin & Tmax [K]: temperature range of the table
+        self.MMP = MMP
+        self.limits = [min(limitsP[0],Tmax),min(limitsP[1],Tmax)]
+        self.c = [[NISTP[j][i] for j in range(7)] for i in range(len(NISTP[0]))]      #[-], coefficients per segment
+        self.c += [self.c[-1]]*(3-len(self.c))
+        self.C = np.array(self.c)                                                       #[-], (3,7) coefficients (fun2)
+        self.Hlimit = [H(self.c[0],limitsP[0],MMP),H(self.c[1],limitsP[1],MMP)]         #[J/kg], limits (as in exact)
+
+        # Enthalpy range of every segment (segment selection of exact) and the matching temperatures
+        Hr = [[H(self.c[0],Tmin,MMP),self.Hlimit[0]],
+              [self.Hlimit[0],self.Hlimit[1] if limitsP[1] < Tmax else H(self.c[1],Tmax,MMP)],
+              [self.Hlimit[1],H(self.c[2],Tmax,MMP) if limitsP[1] < Tmax else self.Hlimit[1]]]
+        lower = [Tmin,self.limits[0],self.limits[1]]
+        self.seg = []
+        for i in range(3):
+            Hlo,Hhi = Hr[i]
+            if not Hlo < Hhi: #segment not used (e.g. ammonia above 1.0e10 K)
+                self.seg.append(None)
+                continue
+            Tlo,Thi = self.invert(i,Hlo,lower[i]),self.invert(i,Hhi,lower[i])
+            n = 64
+            while True:
+                T = np.linspace(Tlo,Thi,n+1)                                            #[K], nodes
+                Tc = np.linspace(Tlo,Thi,4*n+1)                                         #[K], check points
+                if np.any(cp(self.c[i],Tc,MMP) <= 0):
+                    raise ValueError("NIST enthalpy not monotone between %.1f and %.1f K" % (Tlo,Thi))
+                seg = (H(self.c[i],T,MMP),T,1/cp(self.c[i],T,MMP))
+                err = np.max(np.abs(self.interp(seg,H(self.c[i],Tc,MMP))-Tc))          #[K], interpolation error
+                if err < tol or n >= 2**16:
+                    break
+                n *= 2
+            self.seg.append(seg+(seg[0].tolist(),err))
+
+    def invert(self,i,Hx,T0):
+        ### Exact inverse of segment i (bracket widened from T0 until the enthalpy is enclosed)
+        f = lambda T: H(self.c[i],T,self.MMP)-Hx
+        a,b = T0,T0
+        while f(a) > 0:
+            a = max(a-100.0,1.0)
+        while f(b) < 0:
+            b = b+100.0
+        return(brentq(f,a,b,xtol=1e-12))
+
+    def interp(self,seg,Hx):
+        ### Cubic Hermite interpolation T(H) (arrays)
+        Hn,Tn,sn = seg[:3]
+        k = np.clip(np.searchsorted(Hn,Hx)-1,0,len(Hn)-2)
+        h = Hn[k+1]-Hn[k]
+        x = (Hx-Hn[k])/h
+        return ((2*x**3-3*x**2+1)*Tn[k]+(x**3-2*x**2+x)*h*sn[k]
+                +(-2*x**3+3*x**2)*Tn[k+1]+(x**3-x**2)*h*sn[k+1])
+
+    def segment(self,T):
+        return 0 if T < self.limits[0] else (1 if T < self.limits[1] else 2)
+
+    def fun1(self,H6,Tpi,polish=False):
+        ### Temperature [K] after adding H6 [J/kg] to propellant at Tpi [K] (scalar)
+        deltaH6 = H6+H(self.c[self.segment(Tpi)],Tpi,self.MMP)
+        ii = 0 if deltaH6 < self.Hlimit[0] else (1 if deltaH6 < self.Hlimit[1] else 2)
+        seg = self.seg[ii]
+        Hl = seg[3]
+        k = bisect.bisect(Hl,deltaH6)-1
+        if k < 0 or k >= len(Hl)-1: #outside the table
+            return(exact([[c[i] for c in self.c] for i in range(7)],self.limits,self.MMP,H6,Tpi,None))
+        Hn,Tn,sn = seg[0],seg[1],seg[2]
+        h = Hl[k+1]-Hl[k]
+        x = (deltaH6-Hl[k])/h
+        T = ((2*x**3-3*x**2+1)*Tn[k]+(x**3-2*x**2+x)*h*sn[k]
+             +(-2*x**3+3*x**2)*Tn[k+1]+(x**3-x**2)*h*sn[k+1])
+        if polish: #one Newton step
+            T = T-(H(self.c[ii],T,self.MMP)-deltaH6)/cp(self.c[ii],T,self.MMP)
+        return(float(T))
+
+    def fun2(self,H6,Tpi,polish=False):
+        ### Vectorized version of fun1
+        H6,Tpi = np.broadcast_arrays(np.asarray(H6,dtype=float),np.asarray(Tpi,dtype=float))
+        Tpii = (Tpi >= self.limits[0]).astype(int)+(Tpi >= self.limits[1])
+        deltaH6 = H6+H(self.C[Tpii].T,Tpi,self.MMP)                                   #coefficients per element
+        ii = (deltaH6 >= self.Hlimit[0]).astype(int)+(deltaH6 >= self.Hlimit[1])
+        T = np.full(deltaH6.shape,np.nan)
+        for i in range(3):
+            s = ii == i
+            if not np.any(s):
+                continue
+            seg = self.seg[i]
+            inside = s & (deltaH6 >= seg[0][0]) & (deltaH6 <= seg[0][-1])
+            T[inside] = self.interp(seg,deltaH6[inside])
+            if polish:
+                T[inside] -= (H(self.c[i],T[inside],self.MMP)-deltaH6[inside])/cp(self.c[i],T[inside],self.MMP)
+            out = s & ~inside #outside the table
+            for j in np.flatnonzero(out):
+                T[j] = self.fun1(H6[j],Tpi[j])
+        return(T)
+
+
+def exact(NISTP,limitsP,MMP,H6,Tpi,TRAC):
+    ### Newton solve of the NIST enthalpy (reference for the table, used outside its range)
 
     def f(i,T):
         return ((NISTP[0][i]*T/1000+NISTP[1][i]*(T/1000)**2/2                               #[J/kg]
@@ -37,6 +182,43 @@ def fun1(NISTP,limitsP,MMP,H6,Tpi,TRAC):
     def f2(Tpo):
         return (deltaH6-f(ii,Tpo))
   
-    Tpo = newton(f2,298.15)
+    Tpo = newton(f2,[298.15,limitsP[0],limitsP[1]][ii])    #start at the lower limit of the segment (spurious roots below it)
     
     return(Tpo)
+
+
+def exact2(NISTP,limitsP,MMP,H6,Tpi,TRAC,tol=1.48e-8,maxiter=50):
+    ### Vectorized version of exact (Newton with the analytic derivative cp)
+    # NISTP: array (N,7,3), limitsP: array (N,2+), MMP, H6, Tpi & TRAC: arrays (N,)
+
+    N = len(MMP)
+    idx = np.arange(N)
+
+    def f(c,T):
+        t = T/1000
+        return ((c[:,0]*t+c[:,1]*t**2/2+c[:,2]*t**3/3+c[:,3]*t**4/4     #[J/kg]
+                -c[:,4]/t+c[:,5]-c[:,6])*1000/MMP)
+
+    def dfdT(c,T):
+        t = T/1000
+        return (c[:,0]+c[:,1]*t+c[:,2]*t**2+c[:,3]*t**3+c[:,4]/t**2)/MMP   #[J/kg/K], cp
+
+    Tpi = np.asarray(Tpi,dtype=float)
+    Hlimit0 = f(NISTP[:,:,0],limitsP[:,0])      #[J/kg], limit 0
+    Hlimit1 = f(NISTP[:,:,1],limitsP[:,1])      #[J/kg], limit 1
+
+    ### Starting enthalpy of incoming propellant flow (0 at 298.15 K)
+    Tpii = (Tpi >= limitsP[:,0]).astype(int) + (Tpi >= limitsP[:,1])
+    deltaH6 = H6 + f(NISTP[idx,:,Tpii],Tpi)
+
+    ii = (deltaH6 >= Hlimit0).astype(int) + (deltaH6 >= Hlimit1)
+    c = NISTP[idx,:,ii]
+
+    Tpo = np.where(ii == 0,298.15,limitsP[idx,np.maximum(ii-1,0)])    #[K], start at the lower limit of the segment
+    for j in range(maxiter):
+        dT = (f(c,Tpo)-deltaH6)/dfdT(c,Tpo)
+        Tpo = Tpo - dT
+        if np.all(np.abs(dT) < tol*np.maximum(1.0,np.abs(Tpo))):
+            break
+
+    return(Tpo)
@@ -5,52 +5,176 @@ A. Takken
 """
 
 import numpy as np
-from scipy.optimize import newton
 import math
 
-def fun1(DouterA,DouterM,RACtype,ARACo,emO,TRAC,Tamb,pamb,g0,R_A,sigma,kI,insulation,LcavA):
-    MMair = 28.9647e-3                                                                      #[kg/mol], molar mass air
-    SuthC = [18.27e-6,120,291.15]                                                           #[-], Sutherland constants
-        
-    if      RACtype == 0: #cone
-                Nu =    lambda Tf: 0.7+0.35*abs(Ra(Tf))**0.125+0.51*abs(Ra(Tf))**0.25           #[-], cone Nusselt number
-    elif    RACtype == 1: #cylinder
-            if TRAC == Tamb:
-                Nu =    lambda Tf: 0                                                            #[-], cylinder Nusselt number  
+import SUB_rootfind
+import SUB_air
+
+def fun1(DouterA,DouterM,RACtype,ARACo,emO,TRAC,Tamb,pamb,g0,R_A,sigma,kI,insulation,LcavA,kfac=1.0):
+    return(Solver().fun1(DouterA,DouterM,RACtype,ARACo,emO,TRAC,Tamb,pamb,g0,R_A,sigma,kI,insulation,LcavA,kfac))
+
+
+def fun2(DouterA,DouterM,RACtype,ARACo,emO,TRAC,Tamb,pamb,g0,R_A,sigma,kI,insulation,LcavA,kfac=1.0):
+    return(Solver().fun2(DouterA,DouterM,RACtype,ARACo,emO,TRAC,Tamb,pamb,g0,R_A,sigma,kI,insulation,LcavA,kfac))
+
+
+class Solver:
+
+    ### Outer wall (P1, P2 & P3) with a dedicated solver for the insulation balance, for use in a time loop:
+    # solver = SUB_P123.Solver() once, then solver.fun1(...) every step with the same inputs & outputs as SUB_P123.fun1
+    # (or solver.fun2(...) for batch arrays, as SUB_P123.fun2).
+    # With insulation P3 = P1+P2 is solved for x = (Tf-Tamb)/(Tm-Tamb), the film temperature Tf between Tamb and
+    # Tm = (TRAC+Tamb)/2 (insulation temperature between Tamb and TRAC), by a bracketed root find (SUB_rootfind)
+    # warm started from the previous x. The air properties are evaluated once per evaluation of the balance.
+    # Counters: calls, it (root finder iterations), nfev (balance evaluations) and failed (root find without convergence).
+    # kfac: factor on the insulation conductivity (Saffil fit or kI), for uncertainty studies (SUB_montecarlo).
+
+    def __init__(self):
+        self.x = None                   #[-], solution of the previous step (warm start), array for fun2
+        self.calls,self.it,self.nfev,self.failed = 0,0,0,0
+
+    def fun1(self,DouterA,DouterM,RACtype,ARACo,emO,TRAC,Tamb,pamb,g0,R_A,sigma,kI,insulation,LcavA,kfac=1.0):
+
+        def P12(Tf,Tinsu):
+            ### Outer wall convection (P1) & radiation (P2) at film temperature Tf
+            if pamb < 0.5: #if vacuum
+                h = 0.0                                                                     #[W/m2/K], convective heat transfer coefficient
             else:
-                Nu =    lambda Tf: (2/np.log(1+2/((0.518*abs(Ra(Tf))**(1/4)*(1+(0.559/Pr(Tf))   #[-], cylinder Nusselt number
-                        **(3/5))**(-5/12))**15+(0.1*abs(Ra(Tf))**(1/3))**15)**(1/15)))                  
-     
-    if pamb < 0.5: #if vacuum
-        h =     lambda Tf: 0.0                                                                  #[W/m2/K], convective heat transfer coefficient
-    else:
-        mu =    lambda Tf: SuthC[0]*(SuthC[2]+SuthC[1])/(Tf+SuthC[1])*(Tf/SuthC[2])**(3/2)      #[Pa s], dynamic viscosity
-        cp =    lambda Tf: -8.0144e-08*Tf**3+2.1079e-04*Tf**2+2.0633e-02*Tf+9.8367e+02          #[J/kg/K], heat capacity at constant pressure
-        kair =  lambda Tf: 6.25216e-05*Tf + 7.51105e-03                                         #[W/m/K], thermal conductivity air, from NIST & Excel
-        rho =   lambda Tf: pamb/(R_A/MMair)/Tf                                                  #[kg/m3], density
-        beta =  lambda Tf: 1/Tf                                                                 #[1/K], expansion coefficient
-        Pr =    lambda Tf: mu(Tf)*cp(Tf)/kair(Tf)                                               #[-], Prandtl number
-        nu =    lambda Tf: mu(Tf)/rho(Tf)                                                       #[m2/s], kinematic viscosity
-        alpha = lambda Tf: nu(Tf)/Pr(Tf)                                                        #[m2/s], diffusivity
-        Ra =    lambda Tf: g0*beta(Tf)*(Tinsu(Tf)-Tamb)*DouterA**3/nu(Tf)/alpha(Tf)             #[-], Rayleigh number
-        h =     lambda Tf: Nu(Tf)*kair(Tf)/DouterA                                              #[W/m2/K], convective heat transfer coefficient
-    
-    P1 =    lambda Tf: h(Tf)*ARACo*(Tinsu(Tf)-Tamb)                     #[W], power lost to outer wall convection        
-    P2 =    lambda Tf: emO*sigma*ARACo*(Tinsu(Tf)**4-Tamb**4)           #[W], power lost to outer wall radiation
-                                  
-    if insulation == 0: #no insulation
-        Tf =    (TRAC+Tamb)/2               #[K], film temperature
-        Tinsu = lambda Tf: TRAC             #[K], insulation temperature (equal to RAC temperature)
-        P3 =    lambda Tf: 0.0              #[W], no conduction due to lack of insulation
-    else: #insulation
-        if insulation == 1: #Saffil M-Fil  
-            kII =    lambda Tf: 0.0665*math.exp(0.0015*((TRAC+Tinsu(Tf))/2-273.15))         #[W/m/K], thermal conductivity
+                air = SUB_air.fun1(Tf,pamb,R_A)                                             #[-], air properties (mu, cp, k, rho, Pr, nu, alpha)
+                Ra = abs(SUB_air.Ra(air,g0,Tf,Tinsu-Tamb,DouterA))                          #[-], Rayleigh number
+                if RACtype == 0: #cone
+                    Nu = 0.7+0.35*Ra**0.125+0.51*Ra**0.25                                   #[-], cone Nusselt number
+                elif TRAC == Tamb or Ra == 0:
+                    Nu = 0.0                                                                #[-], cylinder Nusselt number
+                else:
+                    Nu = (2/np.log(1+2/((0.518*Ra**(1/4)*(1+(0.559/air.Pr)                  #[-], cylinder Nusselt number
+                         **(3/5))**(-5/12))**15+(0.1*Ra**(1/3))**15)**(1/15)))
+                h = Nu*air.k/DouterA                                                        #[W/m2/K], convective heat transfer coefficient
+            P1 = h*ARACo*(Tinsu-Tamb)                                                       #[W], power lost to outer wall convection
+            P2 = emO*sigma*ARACo*(Tinsu**4-Tamb**4)                                         #[W], power lost to outer wall radiation
+            return(P1,P2,h)
+
+        if insulation == 0: #no insulation
+            Tf = (TRAC+Tamb)/2                                                              #[K], film temperature
+            P1,P2,h = P12(Tf,TRAC)
+            return(P1,P2,0.0,TRAC,h)
+
+        def P3(Tinsu):
+            if insulation == 1: #Saffil M-Fil
+                kII = 0.0665*math.exp(0.0015*((TRAC+Tinsu)/2-273.15))                       #[W/m/K], thermal conductivity
+            else:
+                kII = kI                                                                    #[W/m/K], thermal conductivity
+            return kfac*kII*(2*np.pi*LcavA)/np.log((DouterA)/DouterM)*(TRAC-Tinsu)          #[W], conduction through insulation
+
+        Tm = (TRAC+Tamb)/2                                                                  #[K], upper bound film temperature
+
+        def RESULTANT(x):
+            Tf = Tamb+x*(Tm-Tamb)                                                           #[K], film temperature
+            Tinsu = 2*Tf-Tamb                                                               #[K], insulation temperature
+            P1,P2,h = P12(Tf,Tinsu)
+            return P3(Tinsu)-P1-P2                                                          #[W], resultant equation
+
+        ### Bracketed root find of x in [0,1], warm started with a small bracket around the previous solution
+        ### that is widened until the root is enclosed
+        it,nfev = 0,0
+        if TRAC == Tamb:
+            x = 0.0
         else:
-            kII =    lambda Tf: kI                                                          #[W/m/K], thermal conductivity
-        Tinsu = lambda Tf: 2*Tf-Tamb                                                        #[K], insulation temperature
-        P3 = lambda Tf: kII(Tf)*(2*np.pi*LcavA)/np.log((DouterA)/DouterM)*(TRAC-Tinsu(Tf))  #[W], conduction through insulation
-        
-        RESULTANT = lambda Tf: P3(Tf)-P1(Tf)-P2(Tf)                             #[-], resultant equation
-        Tf = newton(RESULTANT,TRAC)                                             #[-], resulting film temperature
-
-    return(P1(Tf),P2(Tf),P3(Tf),Tinsu(Tf),h(Tf))
+            a,b,fa,fb = 0.0,1.0,None,None
+            if self.x is not None and 0.0 < self.x < 1.0:
+                d = 1e-4                                                                    #[-], initial half width
+                while True:
+                    a,b = max(0.0,self.x-d),min(1.0,self.x+d)
+                    fa,fb = RESULTANT(a),RESULTANT(b)
+                    nfev += 2
+                    if fa*fb <= 0 or (a == 0.0 and b == 1.0):
+                        break
+                    d *= 10
+            x,it,n,ok = SUB_rootfind.fun2(RESULTANT,a,b,fa,fb,xtol=1e-12,ftol=1e-12)       #[-], resulting x
+            nfev += n
+            self.x = x
+            self.failed += not ok
+
+        self.calls += 1
+        self.it += it
+        self.nfev += nfev
+
+        Tf = Tamb+x*(Tm-Tamb)                                                               #[K], resulting film temperature
+        Tinsu = 2*Tf-Tamb                                                                   #[K], insulation temperature
+        P1,P2,h = P12(Tf,Tinsu)
+        return(P1,P2,P3(Tinsu),Tinsu,h)
+
+    def fun2(self,DouterA,DouterM,RACtype,ARACo,emO,TRAC,Tamb,pamb,g0,R_A,sigma,kI,insulation,LcavA,kfac=1.0):
+        ### Vectorized version of fun1 for batch runs
+        # All inputs are arrays (N,) (or scalars), the insulated designs are solved together (SUB_rootfind.fun1)
+
+        arrs = np.broadcast_arrays(DouterA,DouterM,RACtype,ARACo,emO,TRAC,Tamb,pamb,g0,R_A,sigma,kI,insulation,LcavA,kfac)
+        DouterA,DouterM,RACtype,ARACo,emO,TRAC,Tamb,pamb,g0,R_A,sigma,kI,insulation,LcavA,kfac = [np.array(x,dtype=float,ndmin=1) for x in arrs]
+        N = len(TRAC)
+
+        def P12(Tf,Tinsu,s):
+            ### Outer wall convection (P1) & radiation (P2) of the designs s, at film temperature Tf
+            with np.errstate(invalid='ignore',divide='ignore'):
+                air = SUB_air.fun1(Tf,pamb[s],R_A[s])                                       #[-], air properties (mu, cp, k, rho, Pr, nu, alpha)
+                Ra = np.abs(SUB_air.Ra(air,g0[s],Tf,Tinsu-Tamb[s],DouterA[s]))              #[-], Rayleigh number
+                Nu0 = 0.7+0.35*Ra**0.125+0.51*Ra**0.25                                      #[-], cone Nusselt number
+                Nu1 = (2/np.log(1+2/((0.518*Ra**(1/4)*(1+(0.559/air.Pr)                     #[-], cylinder Nusselt number
+                      **(3/5))**(-5/12))**15+(0.1*Ra**(1/3))**15)**(1/15)))
+                Nu1 = np.where((TRAC[s] == Tamb[s]) | (Ra == 0),0.0,Nu1)
+                h = np.where(RACtype[s] == 0,Nu0,Nu1)*air.k/DouterA[s]                      #[W/m2/K], convective heat transfer coefficient
+                h = np.where(pamb[s] < 0.5,0.0,h)
+            P1 = h*ARACo[s]*(Tinsu-Tamb[s])                                                 #[W], power lost to outer wall convection
+            P2 = emO[s]*sigma[s]*ARACo[s]*(Tinsu**4-Tamb[s]**4)                             #[W], power lost to outer wall radiation
+            return(P1,P2,h)
+
+        def P3(Tinsu,s):
+            kII = np.where(insulation[s] == 1,                                              #[W/m/K], thermal conductivity
+                           0.0665*np.exp(0.0015*((TRAC[s]+Tinsu)/2-273.15)),kI[s])          #(Saffil M-Fil or constant)
+            return(kfac[s]*kII*(2*np.pi*LcavA[s])/np.log(DouterA[s]/DouterM[s])*(TRAC[s]-Tinsu))  #[W], conduction through insulation
+
+        Tm = (TRAC+Tamb)/2                                                                  #[K], upper bound film temperature
+
+        ### No insulation
+        every = np.ones(N,dtype=bool)
+        Tf = Tm.copy()                                                                      #[K], film temperature
+        Tinsu = TRAC.copy()                                                                 #[K], insulation temperature (equal to RAC temperature)
+        P3v = np.zeros(N)                                                                   #[W], no conduction due to lack of insulation
+
+        ### Insulation, solved for x (see fun1) with a warm start from the previous x where possible
+        ins = np.flatnonzero(insulation > 0)
+        if len(ins):
+            def RESULTANT(x,act):
+                s = ins[act]
+                Tfs = Tamb[s]+x*(Tm[s]-Tamb[s])                                             #[K], film temperature
+                P1,P2,h = P12(Tfs,2*Tfs-Tamb[s],s)
+                return(P3(2*Tfs-Tamb[s],s)-P1-P2)                                           #[W], resultant equation
+
+            n = len(ins)
+            all_ = np.ones(n,dtype=bool)
+            a,b,fa,fb = np.zeros(n),np.ones(n),None,None
+            if self.x is not None and len(self.x) == N:
+                x0 = self.x[ins]
+                warm = (x0 > 0.0) & (x0 < 1.0)
+                a,b = np.where(warm,np.maximum(0.0,x0-1e-4),0.0),np.where(warm,np.minimum(1.0,x0+1e-4),1.0)
+                fa,fb = RESULTANT(a,all_),RESULTANT(b,all_)
+                cold = ~(fa*fb <= 0)
+                if np.any(cold): #full bracket
+                    a,b = np.where(cold,0.0,a),np.where(cold,1.0,b)
+                    fa[cold],fb[cold] = RESULTANT(a[cold],cold),RESULTANT(b[cold],cold)
+                self.nfev += 2*n+2*int(np.sum(cold))
+            x,it,ok = SUB_rootfind.fun1(RESULTANT,a,b,xtol=1e-12,ftol=1e-12,fa=fa,fb=fb)
+            x = np.where(TRAC[ins] == Tamb[ins],0.0,x)
+            if self.x is None or len(self.x) != N:
+                self.x = np.full(N,np.nan)
+            self.x[ins] = x
+            self.it += it
+            self.failed += int(np.sum(~ok))
+
+            Tf[ins] = Tamb[ins]+x*(Tm[ins]-Tamb[ins])                                       #[K], resulting film temperature
+            Tinsu[ins] = 2*Tf[ins]-Tamb[ins]                                                #[K], insulation temperature
+            P3v[ins] = P3(Tinsu[ins],ins)
+        self.calls += 1
+
+        P1,P2,h = P12(Tf,Tinsu,every)
+
+        return(P1,P2,P3v,Tinsu,h)
@@ -5,80 +5,214 @@ A. Takken
 """
 
 import numpy as np
-from scipy.optimize import minimize_scalar
 
 import SUB_muPandkP
 import SUB_cp
+import SUB_properties
 import SUB_HtoT
 import SUB_TtoH
+import SUB_rootfind
 
 def fun1(Dh,DmeanM,Lch,Aheat,mdot,mdotch,Tpi,TRAC,propellant,channellayout,NISTP,limitsP,MMP,Acs):
+    return(Solver().fun1(Dh,DmeanM,Lch,Aheat,mdot,mdotch,Tpi,TRAC,propellant,channellayout,NISTP,limitsP,MMP,Acs))
 
-    mu = lambda Tb: SUB_muPandkP.fun1(propellant,Tb)[0]                             #[Pa s], dynamic viscosity
-    k = lambda Tb: SUB_muPandkP.fun1(propellant,Tb)[1]                              #[W/m/K], thermal conductivity
-    cp = lambda Tb: SUB_cp.fun1(Tb,NISTP,limitsP,MMP)                               #[J/kg/K], heat capacity at constant pressure
-    Tpo1 = lambda Tb: SUB_HtoT.fun1(NISTP,limitsP,MMP,P6(Tb)/mdot,Tpi,TRAC)         #[K], output temperature
-  
-    def Tpo2(Tb):
-        return 2*Tb-Tpi                                                         #[K], output temperature
-    
-    def PrP(Tb):
-        return mu(Tb)*cp(Tb)/k(Tb)                                              #[-], channel Prandtl number
-    
-    def ReD(Tb):
-        return mdotch*Dh/(Acs*mu(Tb))                                           #[-], channel Reynolds number
-    
-    def hP(Tb):
-        return NuP(Tb)*k(Tb)/Dh                                                 #[W/m2/K], convective heat transfer coefficient
-
-    if Tpi == TRAC:
-        def P6(Tb):
-            return 0.0
-    else:
-        def P6(Tb):
-            return hP(Tb)*Aheat*(Tpo2(Tb)-Tpi)/np.log((TRAC-Tpi)/(TRAC-Tpo2(Tb))) #[W], channel propellant convection
-
-    Rei = ReD(Tpi)                                                              #[-], inflow Reynolds number
-    
-    if channellayout == 0: #straight channels
-        if Rei < 2300: #laminar flow                 
-            def NuP(Tb):
-                return (3.657+0.0677*(ReD(Tb)*PrP(Tb)*Dh/Lch)**1.33/            #[-], Nusselt number (Stephan)
-                        (1+0.1*PrP(Tb)*(ReD(Tb)*Dh/Lch)**0.3))  
-        elif Rei < 5.0e6: #turbulent flow
-            def fDB(Tb):    
-                return (0.790*np.log(ReD(Tb))-1.64)**-2                         #[-], friction factor (Bergman)
-            def NuP(Tb):
-                return (fDB(Tb)/8*(ReD(Tb)-1000)*PrP(Tb)/(1+12.7*(fDB(Tb)/8)    #[-], Nusselt number (Gnielinski (enhanced))
-                           **(1/2)*(PrP(Tb)**(2/3)-1))*(1+(Dh/Lch)**(2/3)))    
-     
-    elif channellayout == 1: #spiral channels
-        if Rei < 1.0e4: #laminar flow           
-            def NuP(Tb):
-                return 0.913*(ReD(Tb)*(Dh/DmeanM)**0.5)**0.476*PrP(Tb)**0.2     #[-], Nusselt number (Kalb & Seader)
-        elif Rei < 1.0e5: #turbulent flow      
-            def NuP(Tb):
-                return 0.023*ReD(Tb)**0.85*PrP(Tb)**0.4*(Dh/DmeanM)**0.1        #[-], Nusselt number (Seban & McLaughlin)
-            
-    def RESULTANT(Tb):
-        return abs(Tpo1(Tb)-Tpo2(Tb))                                                #resulting formula, should approach 0
-  
-    if Tpi <= TRAC: 
+
+def regime(Rei,channellayout):
+    ### Laminar & turbulent flow (arrays) from the inflow Reynolds number, limits per channel layout (see Solver.fun1)
+    straight = channellayout == 0
+    lam = np.where(straight,Rei < 2300,Rei < 1.0e4)
+    turb = ~lam & np.where(straight,Rei < 5.0e6,Rei < 1.0e5)
+    return(lam,turb)
+
+
+def Nu(ReD,PrP,Dh,DmeanM,Lch,channellayout,lam,turb):
+    ### Nusselt number (arrays, broadcast) of the correlation of the flow regime & channel layout (see Solver.fun1)
+    straight = channellayout == 0
+    with np.errstate(invalid='ignore',divide='ignore'):
+        fDB = (0.790*np.log(ReD)-1.64)**-2                                      #[-], friction factor (Bergman)
+        Nu = np.where(straight & lam,                                           #[-], Nusselt number (Stephan)
+                      3.657+0.0677*(ReD*PrP*Dh/Lch)**1.33/(1+0.1*PrP*(ReD*Dh/Lch)**0.3),np.nan)
+        Nu = np.where(straight & turb,                                          #[-], Nusselt number (Gnielinski (enhanced))
+                      fDB/8*(ReD-1000)*PrP/(1+12.7*(fDB/8)**(1/2)*(PrP**(2/3)-1))*(1+(Dh/Lch)**(2/3)),Nu)
+        Nu = np.where(~straight & lam,                                          #[-], Nusselt number (Kalb & Seader)
+                      0.913*(ReD*(Dh/DmeanM)**0.5)**0.476*PrP**0.2,Nu)
+        Nu = np.where(~straight & turb,                                         #[-], Nusselt number (Seban & McLaughlin)
+                      0.023*ReD**0.85*PrP**0.4*(Dh/DmeanM)**0.1,Nu)
+    return(Nu)
+
+
+class Solver:
+    ### P6 with a dedicated solver for the bulk temperature (Tb) energy balance, for use in a time loop:
+    # solver = SUB_P6.Solver() once, then solver.fun1(...) with the same inputs & outputs as SUB_P6.fun1 every step.
+    # The balance is solved for u = ln((TRAC-Tpi)/(TRAC-Tpo)) (the number of transfer units for constant cp), which is
+    # smooth where Tpo approaches TRAC, by a bracketed root find (SUB_rootfind.fun2) warm started from the previous u.
+    # Counters: calls, it (root finder iterations), nfev (energy balance evaluations), fallback (Tpo set to TRAC) and
+    # failed (root find without convergence, a cause of fallback).
+
+    def __init__(self):
+        self.u = None                   #[-], solution of the previous step (warm start)
+        self.calls,self.it,self.nfev,self.fallback,self.failed = 0,0,0,0,0
+
+    def fun1(self,Dh,DmeanM,Lch,Aheat,mdot,mdotch,Tpi,TRAC,propellant,channellayout,NISTP,limitsP,MMP,Acs):
+
+        Tm = (Tpi+TRAC)/2                                                               #[K], upper bound bulk temperature
+        dT = TRAC-Tpi                                                                   #[K], inlet temperature difference
+        prop = SUB_properties.propellant(propellant)                                    #[-], cp, mu & k of the propellant
+        Rei = mdotch*Dh/(Acs*prop.mu(Tpi))                                              #[-], inflow Reynolds number
+
+        if channellayout == 0: #straight channels
+            if Rei < 2300: #laminar flow
+                def NuP(ReD,PrP):
+                    return (3.657+0.0677*(ReD*PrP*Dh/Lch)**1.33/                        #[-], Nusselt number (Stephan)
+                            (1+0.1*PrP*(ReD*Dh/Lch)**0.3))
+            elif Rei < 5.0e6: #turbulent flow
+                def NuP(ReD,PrP):
+                    fDB = (0.790*np.log(ReD)-1.64)**-2                                  #[-], friction factor (Bergman)
+                    return (fDB/8*(ReD-1000)*PrP/(1+12.7*(fDB/8)                        #[-], Nusselt number (Gnielinski (enhanced))
+                               **(1/2)*(PrP**(2/3)-1))*(1+(Dh/Lch)**(2/3)))
+
+        elif channellayout == 1: #spiral channels
+            if Rei < 1.0e4: #laminar flow
+                def NuP(ReD,PrP):
+                    return 0.913*(ReD*(Dh/DmeanM)**0.5)**0.476*PrP**0.2                 #[-], Nusselt number (Kalb & Seader)
+            elif Rei < 1.0e5: #turbulent flow
+                def NuP(ReD,PrP):
+                    return 0.023*ReD**0.85*PrP**0.4*(Dh/DmeanM)**0.1                    #[-], Nusselt number (Seban & McLaughlin)
+
+        def state(Tb,u):
+            ### Channel state at bulk temperature Tb (with u = ln((TRAC-Tpi)/(TRAC-Tpo2))), properties evaluated once
+            mu,k = prop.muk(Tb)                                                         #[Pa s] & [W/m/K], viscosity & conductivity
+            cp = prop.cp(Tb)                                                            #[J/kg/K], heat capacity at constant pressure
+            PrP = mu*cp/k                                                               #[-], channel Prandtl number
+            ReD = mdotch*Dh/(Acs*mu)                                                    #[-], channel Reynolds number
+            Tpo2 = 2*Tb-Tpi                                                             #[K], output temperature
+            if dT == 0:
+                P6 = 0.0
+            else:
+                hP = NuP(ReD,PrP)*k/Dh                                                  #[W/m2/K], convective heat transfer coefficient
+                P6 = hP*Aheat*(Tpo2-Tpi)/u                                              #[W], channel propellant convection (log-mean)
+            return(P6,ReD,PrP,Tpo2)
+
+        def Tbu(u):
+            return Tm-dT*np.exp(-u)/2                                                   #[K], bulk temperature
+
+        def RESULTANT(u):
+            Tb = Tbu(u)
+            P6,ReD,PrP,Tpo2 = state(Tb,u)
+            return SUB_HtoT.fun1(NISTP,limitsP,MMP,P6/mdot,Tpi,TRAC)-Tpo2               #resulting formula (Tpo1-Tpo2), should approach 0
+
+        ### Bracketed root find of u in [ulo,uhi] (Tb between Tpi and Tm), warm started with a small bracket around
+        ### the previous solution that is widened until the root is enclosed
+        ulo,uhi = 1e-9,40.0                                                             #[-], full bracket
+        it,nfev,ok,u = 0,0,False,None
         try:
-            Tb = minimize_scalar(RESULTANT,bounds=[Tpi,(Tpi+TRAC)/2], method='bounded',options={'xatol': 1e-5,'maxiter':100})     #[K], resulting bulk temperature    
-            Tb = Tb["x"]
-        except:
-            Tb = (TRAC+Tpi)/2-0.001
-            HTpo = SUB_TtoH.fun1(NISTP,limitsP,MMP,TRAC-0.001,Tpi)
-            P66 = HTpo*mdot      
-    else:
-        Tb = minimize_scalar(RESULTANT,bounds=[(Tpi+TRAC)/2,Tpi], method='bounded',options={'xatol': 1e-5,'maxiter':100})     #[K], resulting bulk temperature   
-        Tb = Tb["x"]
-        
-    P66 = P6(Tb)
-    if abs(Tpo1(Tb)-Tpo2(Tb)) > 1.0:
-        Tb = (TRAC+Tpi)/2-0.001
-        HTpo = SUB_TtoH.fun1(NISTP,limitsP,MMP,TRAC-0.001,Tpi)
-        P66 = HTpo*mdot                    
-
-    return(Tpo2(Tb),P66,ReD(Tb),PrP(Tb),Tb)
+            if dT == 0:
+                Tb,ok = Tpi,True
+            else:
+                a,b,fa,fb = ulo,uhi,None,None
+                if self.u is not None and ulo < self.u < uhi:
+                    d = 0.0005*self.u                                                    #[-], initial half width
+                    while True:
+                        a,b = max(ulo,self.u-d),min(uhi,self.u+d)
+                        fa,fb = RESULTANT(a),RESULTANT(b)
+                        nfev += 2
+                        if fa*fb <= 0 or (a == ulo and b == uhi):
+                            break
+                        d *= 10
+                u,it,n,ok = SUB_rootfind.fun2(RESULTANT,a,b,fa,fb,xtol=1e-9,ftol=1e-6)  #[-], resulting u
+                nfev += n
+                Tb = Tbu(u)                                                             #[K], resulting bulk temperature
+        except (ArithmeticError,ValueError,RuntimeError):
+            ok = False
+
+        fallback = not ok
+        if ok and dT != 0:
+            P66,ReD,PrP,Tpo2 = state(Tb,u)
+            if abs(RESULTANT(u)) > 1.0:
+                fallback = True
+        elif ok:
+            P66,ReD,PrP,Tpo2 = state(Tb,1.0)
+        if fallback: #propellant leaves at the RAC temperature
+            Tb = Tm-0.001
+            P66 = SUB_TtoH.fun1(NISTP,limitsP,MMP,TRAC-0.001,Tpi)*mdot
+            P6,ReD,PrP,Tpo2 = state(Tb,1.0)
+        else:
+            self.u = u
+
+        self.calls += 1
+        self.it += it
+        self.nfev += nfev
+        self.fallback += fallback
+        self.failed += not ok
+
+        return(Tpo2,P66,ReD,PrP,Tb)
+
+def fun2(Dh,DmeanM,Lch,Aheat,mdot,mdotch,Tpi,TRAC,propellant,channellayout,NISTP,limitsP,MMP,Acs,u0=None):
+    ### Vectorized version of fun1 for batch runs, also returns u (see Solver) to warm start the next step with u0
+    # (after a fallback the u where the balance changes sign, at a jump of the properties, the next root is found near it)
+    # All inputs are arrays (N,) of the designs with propellant flow, NISTP: array (N,7,3), limitsP: array (N,2+)
+    # u0: optional array (N,) of the previous solutions (nan if unknown)
+
+    N = len(TRAC)
+
+    def props(Tb,s):
+        mu,k = SUB_muPandkP.fun2(propellant[s],Tb)                                  #[Pa s] & [W/m/K]
+        cp = SUB_cp.fun2(Tb,NISTP[s],limitsP[s],MMP[s])                             #[J/kg/K], heat capacity at constant pressure
+        PrP = mu*cp/k                                                               #[-], channel Prandtl number
+        ReD = mdotch[s]*Dh[s]/(Acs[s]*mu)                                           #[-], channel Reynolds number
+        return(k,PrP,ReD)
+
+    def NuP(ReD,PrP,s):
+        return(Nu(ReD,PrP,Dh[s],DmeanM[s],Lch[s],channellayout[s],lam[s],turb[s]))
+
+    def P6(Tb,u,s):
+        k,PrP,ReD = props(Tb,s)
+        hP = NuP(ReD,PrP,s)*k/Dh[s]                                                 #[W/m2/K], convective heat transfer coefficient
+        Tpo2 = 2*Tb-Tpi[s]                                                          #[K], output temperature
+        P = hP*Aheat[s]*(Tpo2-Tpi[s])/u                                             #[W], channel propellant convection (log-mean)
+        return(np.where(Tpi[s] == TRAC[s],0.0,P))
+
+    def Tbu(u,s):
+        return Tm[s]-(TRAC[s]-Tpi[s])*np.exp(-u)/2                                  #[K], bulk temperature
+
+    def RESULTANT(u,s):
+        Tb = Tbu(u,s)
+        Tpo1 = SUB_HtoT.fun2(NISTP[s],limitsP[s],MMP[s],P6(Tb,u,s)/mdot[s],Tpi[s],TRAC[s])  #[K], output temperature
+        return(Tpo1-(2*Tb-Tpi[s]))                                                          #resulting formula, should approach 0
+
+    ### Flow regime & correlation per design (from the inflow Reynolds number)
+    every = np.ones(N,dtype=bool)
+    Rei = props(Tpi,every)[2]                                                       #[-], inflow Reynolds number
+    lam,turb = regime(Rei,channellayout)
+
+    ### Solved for u = ln((TRAC-Tpi)/(TRAC-Tpo)) (Tb between Tpi and Tm), smooth where Tpo approaches TRAC (see Solver)
+    Tm = (Tpi+TRAC)/2
+    ulo,uhi = np.full(N,1e-9),np.full(N,40.0)                                      #[-], full bracket
+    if u0 is None:
+        a,b,fa,fb = ulo,uhi,None,None
+    else: #warm start as the Solver: small bracket around u0, widened (x10) where it does not enclose the root
+        warm = (u0 > ulo) & (u0 < uhi)
+        d = 0.0005*np.where(warm,u0,1.0)                                            #[-], half width
+        a,b = np.where(warm,np.maximum(ulo,u0-d),ulo),np.where(warm,np.minimum(uhi,u0+d),uhi)
+        fa,fb = RESULTANT(a,every),RESULTANT(b,every)
+        cold = ~(fa*fb <= 0)
+        while np.any(cold):
+            d = np.where(cold,d*10,d)
+            a,b = np.where(cold,np.maximum(ulo,u0-d),a),np.where(cold,np.minimum(uhi,u0+d),b)
+            a,b = np.where(cold & ~warm,ulo,a),np.where(cold & ~warm,uhi,b)
+            fa[cold],fb[cold] = RESULTANT(a[cold],cold),RESULTANT(b[cold],cold)
+            cold = cold & ~(fa*fb <= 0) & ~((a == ulo) & (b == uhi))
+    u,it,ok = SUB_rootfind.fun1(RESULTANT,a,b,xtol=1e-9,ftol=1e-6,fa=fa,fb=fb,fjump=1.0)     #jump: fallback below (|res| > 1 K)
+    u = np.where(Tpi == TRAC,1.0,u)
+    Tb = np.where(Tpi == TRAC,Tpi,Tbu(u,every))
+
+    P66 = P6(Tb,u,every)
+    res = RESULTANT(u,every)
+    fail = ~(np.abs(res) <= 1.0) & (Tpi != TRAC)
+    if np.any(fail): #propellant leaves at the RAC temperature
+        Tb = np.where(fail,Tm-0.001,Tb)
+        P66 = np.where(fail,SUB_TtoH.fun2(NISTP,limitsP,MMP,TRAC-0.001,Tpi)*mdot,P66)
+
+    k,PrP,ReD = props(Tb,every)
+
+    return(2*Tb-Tpi,P66,ReD,PrP,Tb,u)
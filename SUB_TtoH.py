@@ -4,6 +4,8 @@ July 2020
 A. Takken
 """
 
+import numpy as np
+
 def fun1(NISTP,limitsP,MMP,Tpo,Tpi):
 
     def f(i,T):
@@ -29,4 +31,20 @@ def fun1(NISTP,limitsP,MMP,Tpo,Tpi):
         
 
     
+    return(H)
+
+
+def fun2(NISTP,limitsP,MMP,Tpo,Tpi):
+    ### Vectorized version of fun1 for batch runs
+    # NISTP: array (N,7,3), limitsP: array (N,2+), MMP, Tpo & Tpi: arrays (N,)
+
+    def f(T):
+        ii = (T >= limitsP[:,0]).astype(int) + (T >= limitsP[:,1])     #[-], NIST segment
+        c = NISTP[np.arange(len(T)),:,ii]
+        t = T/1000
+        return ((c[:,0]*t+c[:,1]*t**2/2+c[:,2]*t**3/3+c[:,3]*t**4/4     #[J/kg]
+                -c[:,4]/t+c[:,5]-c[:,6])*1000/MMP)
+
+    H = f(np.asarray(Tpo,dtype=float)) - f(np.asarray(Tpi,dtype=float))
+
     return(H)
@@ -0,0 +1,39 @@
+"""
+Air film properties (natural convection of P1 & P4)
+July 2020
+A. Takken
+"""
+
+### All film properties in one pass, for floats or arrays: air = SUB_air.fun1(Tf,pamb,R_A), then air.mu, air.Pr, ...
+### The last float evaluation is kept: P123 (without insulation) and P4 use the same film temperature every step.
+
+import numpy as np
+from collections import namedtuple
+
+MMair = 28.9647e-3                                                                          #[kg/mol], molar mass air
+SuthC = [18.27e-6,120,291.15]                                                               #[-], Sutherland constants
+
+Air = namedtuple("Air",["mu","cp","k","rho","Pr","nu","alpha"])
+last = [None,None]                                                                          #[-], key (Tf,pamb,R_A) & result of the last float evaluation
+
+
+def fun1(Tf,pamb,R_A):
+    ### Air properties at film temperature Tf [K] and pressure pamb [Pa]
+    if isinstance(Tf,float) and last[0] == (Tf,pamb,R_A):
+        return(last[1])
+    mu = SuthC[0]*(SuthC[2]+SuthC[1])/(Tf+SuthC[1])*(Tf/SuthC[2])**(3/2)                     #[Pa s], dynamic viscosity
+    cp = -8.0144e-08*Tf**3+2.1079e-04*Tf**2+2.0633e-02*Tf+9.8367e+02                         #[J/kg/K], heat capacity at constant pressure
+    kair = 6.25216e-05*Tf + 7.51105e-03                                                      #[W/m/K], thermal conductivity air, from NIST & Excel
+    rho = pamb/(R_A/MMair)/Tf                                                               #[kg/m3], density
+    Pr = mu*cp/kair                                                                         #[-], Prandtl number
+    nu = mu/rho                                                                             #[m2/s], kinematic viscosity
+    alpha = nu/Pr                                                                           #[m2/s], diffusivity
+    air = Air(mu,cp,kair,rho,Pr,nu,alpha)
+    if isinstance(Tf,float):
+        last[0],last[1] = (Tf,pamb,R_A),air
+    return(air)
+
+
+def Ra(air,g0,Tf,dT,L):
+    ### Rayleigh number [-] for a temperature difference dT [K] over length L [m] (expansion coefficient 1/Tf)
+    return g0/Tf*dT*L**3/air.nu/air.alpha
@@ -0,0 +1,174 @@
+"""
+Batch solver: N RAC designs stepped in lockstep as NumPy arrays
+July 2020
+A. Takken
+"""
+
+### Usage
+# import SUB_simulate, SUB_batch
+# configs = [dict(SUB_simulate.inputs(),PinR=P,Dh=D) for P in [200.0,250.0] for D in [0.0005,0.0006]]
+# out = SUB_batch.simulate(configs)       #dict with arrays (N,) of the summary, "keep=True" for time series (n,N)
+#
+# Every design has its own inputs (power, mass flow schedule, geometry, material, insulation, propellant, ...),
+# only "n_t" and "t_step" must be equal for all designs. A design is frozen once it exceeds its melting temperature.
+# Instead of printing "Not choked flow!", designs with (at least one step of) not choked flow are flagged in "unchoked".
+# The schedules (burns, irradiation windows, eclipses) are the step ranges of SUB_schedule, as in SUB_simulate.
+# The P6 root find runs in lockstep (the step takes the iterations of the slowest design), warm started per design:
+# faster than separate SUB_simulate runs from about 100 designs (1000 designs: 8.1 s vs 44.9 s), slower for a few.
+
+import SUB_simulate
+import SUB_cp
+import SUB_nozzle
+import SUB_pLoss
+import SUB_P123
+import SUB_P4
+import SUB_P6
+import SUB_schedule
+
+import numpy as np
+
+
+def pad(NIST,n):
+    ### NIST coefficients as an array (n,segments), segments padded to 3 by repeating the last one
+    NIST = np.array(NIST,dtype=float)[:n]
+    return(np.concatenate([NIST]+[NIST[:,-1:]]*(3-NIST.shape[1]),axis=1))
+
+
+def setup(configs):
+    ### One-time calculations of every design (SUB_simulate.setup), stacked in arrays (N,)
+    configs = [dict(SUB_simulate.inputs(),**c) for c in configs]
+    cases = [SUB_simulate.setup(c) for c in configs]
+    for key in ["n_t","t_step"]:
+        if len(set(c[key] for c in configs)) > 1:
+            raise ValueError("all designs in a batch need the same "+key)
+
+    b = {}
+    for key in ["PinR","Tamb","pamb","RACtype","material","TRAC","insulation","propellant","pIn","Tpi",
+                "channellayout","DouterM","DmeanM","Dh","nch","ksiF","pe_min"]:
+        b[key] = np.array([c[key] for c in configs],dtype=float)
+    for key in ["g0","R_A","sigma","MMP","emM","T_maxM","MMM","kI","emO","DouterA","LcavA",
+                "ARACi","ARACo","MRAC","Lch","Aheat","Acs","LsI","RlossE","Pin","Cda","Cdb"]:
+        b[key] = np.array([c[key] for c in cases],dtype=float)
+    for key in ["RACtype","material","insulation","propellant","channellayout"]:
+        b[key] = b[key].astype(int)
+    b["NISTP"] = np.array([pad(c["NISTP"],7) for c in cases])                  #[-], (N,7,3)
+    b["limitsP"] = np.array([c["limitsP"][:2] for c in cases],dtype=float)     #[K], (N,2)
+    b["NISTM"] = np.array([pad(c["NISTM"],5) for c in cases])                  #[-], (N,5,3)
+    b["limitsM"] = np.array([c["limitsM"][:2] for c in cases],dtype=float)     #[K], (N,2)
+
+    # Schedules: segments of constant irradiation & mass flow (SUB_schedule) as step ranges, padded with the last segment
+    steps = [SUB_schedule.fun2(c) or [(0,0,0.0,0.0)] for c in configs]
+    S = max(len(x) for x in steps)
+    n = int(configs[0]["n_t"]*3600/configs[0]["t_step"])                       #[-], number of steps
+    b["i1"] = np.array([[x[1] for x in seg[:-1]]+[n]*(S-len(seg)+1) for seg in steps],dtype=int)   #[-], (N,S) end steps
+    b["f"] = np.array([[x[2] for x in seg]+[seg[-1][2]]*(S-len(seg)) for seg in steps],dtype=float)    #[-], (N,S) power fraction
+    b["mdot"] = np.array([[x[3] for x in seg]+[seg[-1][3]]*(S-len(seg)) for seg in steps],dtype=float) #[kg/s], (N,S) mass flow
+    b["kfac"] = np.ones(len(configs))                                         #[-], factor on the insulation conductivity
+    b["n_t"],b["t_step"] = configs[0]["n_t"],configs[0]["t_step"]
+    b["N"] = len(configs)
+    return(b)
+
+
+def simulate(configs,b=None,keep=False):
+    ### Transient loop for all designs at once. "b" can be passed to reuse setup(configs)
+    if b is None:
+        b = setup(configs)
+    N,t_step = b["N"],b["t_step"]
+    n = int(b["n_t"]*3600/t_step)                   #[-], number of steps
+    TRAC = b["TRAC"].copy()
+    Tamb,pamb,Tpi,pIn = b["Tamb"],b["pamb"],b["Tpi"],b["pIn"]
+    R_A,MMP,Acs,nch = b["R_A"],b["MMP"],b["Acs"],b["nch"]
+
+    # Running summary (same quantities as SUB_simulate.summary)
+    s = {"TRACmax":TRAC.copy(),"Tpomax":np.full(N,-np.inf),"Ispmax":np.zeros(N),"Fmax":np.zeros(N),
+         "pcmin":b["pIn"].copy(),"vRmax":np.zeros(N),"PrPmin":np.full(N,np.inf),"PrPmax":np.zeros(N),
+         "ReDmin":np.full(N,np.inf),"ReDmax":np.zeros(N),"ReT":np.zeros(N),"Cd":np.zeros(N),"At":np.zeros(N),"Ae":np.zeros(N),
+         "P":np.zeros((N,8)),"unchoked":np.zeros(N,dtype=bool),"steps":np.zeros(N,dtype=int),"melted":np.zeros(N,dtype=bool)}
+    if keep:
+        series = {key:np.full((n,N),np.nan) for key in ["TRAC","Tinsu","Tpo","pc","F","Isp","vR","ReD","PrP"]}
+        series["P"] = np.full((n,8,N),np.nan)
+
+    alive = np.ones(N,dtype=bool)
+    u = np.full(N,np.nan)                           #[-], P6 solution of the previous step (warm start, see SUB_P6.Solver)
+    P123solver = SUB_P123.Solver()                  #[-], outer wall solver (warm started every step)
+    r = np.arange(N)
+    k = np.zeros(N,dtype=int)                       #[-], current segment of the schedule of every design
+    for i in range(0,n):
+        k += i >= b["i1"][r,k]                      #[-], next segment (segments are at least one step long)
+
+        ### P1, P2 and P3. Outer (insulation) wall convection & radiation
+        P1,P2,P3,Tinsu,h123 = P123solver.fun2(b["DouterA"],b["DouterM"],b["RACtype"],b["ARACo"],b["emO"],TRAC,Tamb,pamb,
+                                            b["g0"],R_A,b["sigma"],b["kI"],b["insulation"],b["LcavA"],b["kfac"])
+
+        ### P4. Inner wall convection
+        with np.errstate(invalid='ignore',divide='ignore'):
+            P4 = SUB_P4.fun1(b["LsI"],b["ARACi"],TRAC,Tamb,pamb,b["g0"],R_A)[0]
+        P4 = np.where(pamb < 0.5,0.0,P4)
+
+        ### P5. Inner wall radiation
+        P5 = b["emM"]*b["sigma"]*b["ARACi"]*(TRAC**4-Tamb**4)*b["RlossE"]
+
+        ### Propellant flow
+        mdot = b["mdot"][r,k]                                               #[kg/s], current mass flow
+        P6,F,Isp,Tpo,pc,vR,ReD,PrP = (np.zeros(N),np.zeros(N),np.zeros(N),Tpi.copy(),pIn.copy(),
+                                      np.zeros(N),np.zeros(N),np.zeros(N))
+        f = np.flatnonzero((mdot > 0) & alive)
+        if len(f):
+            mdotch = mdot[f]/nch[f]
+            Tpo[f],P6[f],ReD[f],PrP[f],Tb,u[f] = SUB_P6.fun2(b["Dh"][f],b["DmeanM"][f],b["Lch"][f],b["Aheat"][f],mdot[f],mdotch,Tpi[f],
+                                                             TRAC[f],b["propellant"][f],b["channellayout"][f],b["NISTP"][f],b["limitsP"][f],MMP[f],Acs[f],
+                                                             u0=u[f])
+            pc[f] = SUB_pLoss.fun2(ReD[f],b["Dh"][f],b["DmeanM"][f],b["Lch"][f],b["channellayout"][f],R_A[f],Tb,mdotch,pIn[f],MMP[f])
+            F[f],Isp[f],ReT,At,Ae,Cd,choked = SUB_nozzle.fun2(pc[f],mdot[f],R_A[f],MMP[f],Tpo[f],pamb[f],b["g0"][f],b["propellant"][f],
+                                                       b["NISTP"][f],b["limitsP"][f],b["pe_min"][f],b["ksiF"][f],b["Cda"][f],b["Cdb"][f])
+            rho = pIn[f]/(R_A[f]/MMP[f]*Tpi[f])                             #[kg/m3], inflow density
+            vR[f] = mdotch/rho/Acs[f]/(175*(1/rho)**0.43)                   #[-], end velocity over maximum velocity
+            s["At"][f],s["Ae"][f] = At,Ae
+            s["unchoked"][f] |= ~choked
+        s["ReT"][alive],s["Cd"][alive] = 0.0,0.0
+        if len(f):
+            s["ReT"][f],s["Cd"][f] = ReT,Cd
+
+        ### P7. Heating of RAC
+        PinL = b["f"][r,k]*b["Pin"]                                         #[W], absorbed power
+        P7 = PinL - (P1+P2+P4+P5+P6)                                        #[W], power to heat the RAC
+        cpM = SUB_cp.fun2(TRAC,b["NISTM"],b["limitsM"],b["MMM"])           #[J/kg/K], specific heat (material)
+        TRAC = np.where(alive,TRAC + P7*t_step/cpM/b["MRAC"],TRAC)          #[K], resulting RAC temperature
+
+        ### Summary & saves (designs that are still running)
+        a = alive
+        s["TRACmax"][a] = np.maximum(s["TRACmax"][a],TRAC[a])
+        s["Tpomax"][a] = np.maximum(s["Tpomax"][a],Tpo[a])
+        s["Ispmax"][a] = np.maximum(s["Ispmax"][a],Isp[a])
+        s["Fmax"][a] = np.maximum(s["Fmax"][a],F[a])
+        s["pcmin"][a] = np.minimum(s["pcmin"][a],pc[a])
+        s["vRmax"][a] = np.maximum(s["vRmax"][a],vR[a])
+        s["PrPmin"][a],s["PrPmax"][a] = np.minimum(s["PrPmin"][a],PrP[a]),np.maximum(s["PrPmax"][a],PrP[a])
+        s["ReDmin"][a],s["ReDmax"][a] = np.minimum(s["ReDmin"][a],ReD[a]),np.maximum(s["ReDmax"][a],ReD[a])
+        Pall = np.stack([b["Pin"],P1,P2,P3,P4,P5,P6,P7],axis=1)
+        s["P"][a] = Pall[a]
+        s["steps"][a] += 1
+        if keep:
+            for key,val in [("TRAC",TRAC),("Tinsu",Tinsu),("Tpo",Tpo),("pc",pc),("F",F),("Isp",Isp),("vR",vR),("ReD",ReD),("PrP",PrP)]:
+                series[key][i,a] = val[a]
+            series["P"][i][:,a] = Pall[a].T
+
+        ### Exceeding material melting temperature
+        melt = alive & (TRAC > b["T_maxM"])
+        if np.any(melt):
+            s["melted"][melt] = True
+            alive = alive & ~melt
+            if not np.any(alive):
+                break
+
+    ### Same names as SUB_simulate.summary
+    flow = s["Ispmax"] > 0.0
+    out = {"TRACmax":s["TRACmax"],"flow":flow,"Tpomax":s["Tpomax"],"eta":s["P"][:,6]/b["PinR"],"Ispmax":s["Ispmax"],
+           "Fmax":s["Fmax"],"pLossmax":b["pIn"]-s["pcmin"],"vRmax":s["vRmax"],"PrPmin":s["PrPmin"],"PrPmax":s["PrPmax"],
+           "ReDmin":s["ReDmin"],"ReDmax":s["ReDmax"],"ReT":s["ReT"],"Cd":s["Cd"],
+           "Dt":np.sqrt(s["At"]*1e6*4/np.pi),"De":np.sqrt(s["Ae"]*1e6*4/np.pi),
+           "P":s["P"],"steps":s["steps"],"melted":s["melted"],"unchoked":s["unchoked"]}
+    if keep:
+        series["t"] = np.arange(n)*t_step/60.0
+        out["series"] = series
+    return(out)
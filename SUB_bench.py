@@ -0,0 +1,157 @@
+"""
+Benchmarks of the hot-path functions and a full reference run, with machine-readable baselines
+July 2020
+A. Takken
+"""
+
+### Usage
+# python SUB_bench.py                                    #prints the timings
+# python SUB_bench.py --save base.json                   #... and saves them as a baseline
+# python SUB_bench.py --compare base.json                #... and compares them with a baseline (ratio new/old)
+# python SUB_bench.py --quick                            #without the full 95 minute run
+#
+# results = SUB_bench.run()                               #{name: {"seconds": per call, "calls":, "repeat":}}
+# SUB_bench.save(results,"base.json"), SUB_bench.compare(results,SUB_bench.load("base.json"))
+#
+# Every function is timed at representative RAC temperatures ("temperatures") for all four propellants where the
+# propellant matters, with the inputs of the default design (SUB_simulate.inputs()). The time per call is the best of
+# "repeat" repeats of enough calls to take at least "mintime" seconds. A baseline also holds the Python, NumPy &
+# platform versions; timings are only comparable on the same machine.
+
+import SUB_simulate
+import SUB_P6
+import SUB_channel
+import SUB_HtoT
+import SUB_TtoH
+import SUB_P123
+import SUB_nozzle
+import SUB_spiral
+import SUB_viewfactorscone
+import SUB_viewfactorscylinder
+
+import json
+import time
+import platform
+import argparse
+import numpy as np
+
+temperatures = [400.0,800.0,1200.0]            #[K], RAC (or propellant outlet) temperatures
+propellants = [0,1,2,3]                         #[-], N2, water, ammonia & H2
+
+
+def timer(fun,repeat=5,mintime=0.05):
+    ### Best time per call [s] of fun() and the number of calls per repeat
+    n,t = 1,0.0
+    while True: #calls per repeat
+        t0 = time.perf_counter()
+        for k in range(n):
+            fun()
+        t = time.perf_counter()-t0
+        if t >= mintime or n >= 10**6:
+            break
+        n *= 10 if t < mintime/10 else 2
+    best = t/n
+    for r in range(repeat-1):
+        t0 = time.perf_counter()
+        for k in range(n):
+            fun()
+        best = min(best,(time.perf_counter()-t0)/n)
+    return(best,n)
+
+
+def cases():
+    ### Benchmarks as {name: function without arguments}
+    benchmarks = {}
+    for p in propellants:
+        c = dict(SUB_simulate.inputs(),propellant=p)
+        case = SUB_simulate.setup(c)
+        mdot = c["mdot"][0]
+        for T in temperatures:
+            benchmarks["P6.fun1/%d/%d" % (p,T)] = (lambda c=c,case=case,mdot=mdot,T=T,p=p:
+                SUB_P6.fun1(c["Dh"],c["DmeanM"],case["Lch"],case["Aheat"],mdot,mdot/c["nch"],c["Tpi"],T,p,c["channellayout"],
+                            case["NISTP"],case["limitsP"],case["MMP"],case["Acs"]))
+            benchmarks["channel.fun1/%d/%d" % (p,T)] = (lambda c=c,case=case,mdot=mdot,T=T,p=p:     #20 segments, cold start
+                SUB_channel.Solver(20,c["pIn"],case["R_A"]).fun1(c["Dh"],c["DmeanM"],case["Lch"],case["Aheat"],mdot,mdot/c["nch"],
+                                                                 c["Tpi"],T,p,c["channellayout"],case["NISTP"],case["limitsP"],case["MMP"],case["Acs"]))
+            H6 = SUB_TtoH.fun1(case["NISTP"],case["limitsP"],case["MMP"],T-10.0,c["Tpi"])      #[J/kg], enthalpy rise
+            benchmarks["HtoT.fun1/%d/%d" % (p,T)] = (lambda c=c,case=case,H6=H6,T=T,p=p:
+                SUB_HtoT.fun1(case["NISTP"],case["limitsP"],case["MMP"],H6,c["Tpi"],T))
+            benchmarks["nozzle.fun1/%d/%d" % (p,T)] = (lambda c=c,case=case,mdot=mdot,T=T,p=p:
+                SUB_nozzle.fun1(c["pIn"],mdot,case["R_A"],case["MMP"],T,c["pamb"],case["g0"],p,case["NISTP"],case["limitsP"],
+                                c["pe_min"],c["ksiF"],case["Cda"],case["Cdb"]))
+
+    for insulation in [0,1]:
+        c = dict(SUB_simulate.inputs(),insulation=insulation)
+        case = SUB_simulate.setup(c)
+        for T in temperatures:
+            benchmarks["P123.fun1/%d/%d" % (insulation,T)] = (lambda c=c,case=case,T=T:
+                SUB_P123.fun1(case["DouterA"],c["DouterM"],c["RACtype"],case["ARACo"],case["emO"],T,c["Tamb"],c["pamb"],
+                              case["g0"],case["R_A"],case["sigma"],case["kI"],c["insulation"],case["LcavA"]))
+
+    c = SUB_simulate.inputs()
+    for RACtype,name in [(0,"cone"),(1,"cylinder")]:
+        benchmarks["spiral.fun1/"+name] = lambda RACtype=RACtype: SUB_spiral.fun1(RACtype,c["LcavC"],c["DmeanM"],c["pitch"])
+    benchmarks["viewfactors/cone"] = lambda: SUB_viewfactorscone.fun1(c["DinnerM"]/2,c["Dap"]/2,c["LcavI"],c["absoIC"])
+    benchmarks["viewfactors/cylinder"] = lambda: SUB_viewfactorscylinder.fun1(c["DinnerM"]/2,c["Dap"]/2,c["LcavI"],c["absoIC"])
+    return(benchmarks)
+
+
+def run(full=True,repeat=5,mintime=0.05,names=None,verbose=False):
+    ### Times all benchmarks (names: only those starting with one of the given names), full: with the reference run
+    results = {}
+    benchmarks = cases()
+    if full:
+        benchmarks["simulate/reference"] = lambda: SUB_simulate.simulate(SUB_simulate.inputs())
+    for name,fun in benchmarks.items():
+        if names and not any(name.startswith(n) for n in names):
+            continue
+        with np.errstate(invalid='ignore'):
+            if name == "simulate/reference": #95 minutes of 1 s steps, a few repeats
+                seconds,calls = timer(fun,repeat=min(repeat,3),mintime=0.0)
+            else:
+                seconds,calls = timer(fun,repeat=repeat,mintime=mintime)
+        results[name] = {"seconds":seconds,"calls":calls,"repeat":repeat}
+        if verbose:
+            print("%-28s %12.3e s" % (name,seconds))
+    return(results)
+
+
+def save(results,path):
+    ### Baseline file (JSON) with the timings & the versions
+    meta = {"python":platform.python_version(),"numpy":np.__version__,"platform":platform.platform(),
+            "machine":platform.machine(),"date":time.strftime("%Y-%m-%d %H:%M:%S")}
+    with open(path,"w") as f:
+        json.dump({"meta":meta,"results":results},f,indent=1)
+
+
+def load(path):
+    ### Timings of a baseline file
+    with open(path) as f:
+        return(json.load(f)["results"])
+
+
+def compare(results,baseline,tolerance=0.10):
+    ### Ratio new/old time per benchmark, printed with "slower"/"faster" beyond the tolerance; returns the ratios
+    ratios = {}
+    for name,r in results.items():
+        if name not in baseline:
+            continue
+        ratios[name] = r["seconds"]/baseline[name]["seconds"]
+        flag = "slower" if ratios[name] > 1+tolerance else ("faster" if ratios[name] < 1/(1+tolerance) else "")
+        print("%-28s %12.3e s %12.3e s %7.2fx %s" % (name,baseline[name]["seconds"],r["seconds"],ratios[name],flag))
+    return(ratios)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks of the PDT")
+    parser.add_argument("--save",help="baseline file to write")
+    parser.add_argument("--compare",help="baseline file to compare with")
+    parser.add_argument("--quick",action="store_true",help="without the full reference run")
+    parser.add_argument("--only",nargs="*",help="benchmarks starting with these names")
+    args = parser.parse_args()
+    results = run(full=not args.quick,names=args.only,verbose=args.compare is None)
+    if args.compare:
+        ratios = compare(results,load(args.compare))
+        print("geometric mean ratio: %.3f" % np.exp(np.mean(np.log(list(ratios.values())))) if ratios else "no common benchmarks")
+    if args.save:
+        save(results,args.save)
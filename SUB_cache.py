@@ -0,0 +1,93 @@
+"""
+Geometry cache (view factor losses & channel length), with eviction and saving to disk
+July 2020
+A. Takken
+"""
+
+### Usage
+# RlossA,RlossE = SUB_cache.viewfactors(RACtype,DinnerM,Dap,LcavI,absoIC)     #instead of SUB_viewfactorscone/cylinder
+# Lch = SUB_cache.spiral(RACtype,LcavC,DmeanM,pitch)                         #instead of SUB_spiral
+# SUB_cache.save("geometry.json"), SUB_cache.load("geometry.json")           #keep the results for a next session
+#
+# Both are pure functions of the geometry, so every combination is calculated once (per process).
+# The least recently used results are dropped once a cache holds "maxsize" of them.
+
+import SUB_viewfactorscone
+import SUB_viewfactorscylinder
+import SUB_spiral
+
+import os
+import json
+from collections import OrderedDict
+
+
+class Cache:
+
+    def __init__(self,fun,maxsize=10000):
+        self.fun = fun                  #[-], function of the key
+        self.maxsize = maxsize          #[-], maximum number of results
+        self.data = OrderedDict()
+        self.hits,self.misses = 0,0
+
+    def __call__(self,*key):
+        key = tuple(float(k) for k in key)
+        if key in self.data:
+            self.hits += 1
+            self.data.move_to_end(key)
+        else:
+            self.misses += 1
+            self.data[key] = tuple(float(v) for v in self.fun(*key))
+            if len(self.data) > self.maxsize:
+                self.data.popitem(last=False)           #least recently used
+        return(self.data[key])
+
+    def clear(self):
+        self.data.clear()
+        self.hits,self.misses = 0,0
+
+
+def fun1(RACtype,DinnerM,Dap,LcavI,absoIC):
+    ### Radiation loss factors (absorption, emission) of the cavity
+    if RACtype == 0: #cone
+        return(SUB_viewfactorscone.fun1(DinnerM/2,Dap/2,LcavI,absoIC)[:2])
+    elif RACtype == 1: #cylinder
+        return(SUB_viewfactorscylinder.fun1(DinnerM/2,Dap/2,LcavI,absoIC))
+
+
+def fun2(RACtype,LcavC,DmeanM,pitch):
+    ### Spiral channel length
+    return((SUB_spiral.fun1(int(RACtype),LcavC,DmeanM,pitch),))
+
+
+caches = {"viewfactors":Cache(fun1),"spiral":Cache(fun2)}
+
+
+def viewfactors(RACtype,DinnerM,Dap,LcavI,absoIC):
+    ### (RACtype, DinnerM, Dap, LcavI, absoIC) -> (RlossA, RlossE)
+    return(caches["viewfactors"](RACtype,DinnerM,Dap,LcavI,absoIC))
+
+
+def spiral(RACtype,LcavC,DmeanM,pitch):
+    ### (RACtype, LcavC, DmeanM, pitch) -> Lch [m]
+    return(caches["spiral"](RACtype,LcavC,DmeanM,pitch)[0])
+
+
+def save(path):
+    ### Writes all caches to a JSON file
+    data = {name:[[list(k),list(v)] for k,v in cache.data.items()] for name,cache in caches.items()}
+    with open(path,"w") as f:
+        json.dump(data,f)
+
+
+def load(path):
+    ### Adds the results of a file written by save() (if it exists) to the caches
+    if not os.path.exists(path):
+        return
+    with open(path) as f:
+        data = json.load(f)
+    for name,items in data.items():
+        cache = caches[name]
+        for k,v in items:
+            cache.data[tuple(k)] = tuple(v)
+        while len(cache.data) > cache.maxsize:
+            cache.data.popitem(last=False)
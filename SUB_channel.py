@@ -0,0 +1,122 @@
+"""
+Axially discretized channel flow (local ReD, PrP, Nusselt number & pressure drop per segment)
+July 2020
+A. Takken
+"""
+
+### Usage
+# config["segments"] = 20                       #SUB_simulate (& SUB_network): channels marched in 20 segments along Lch
+# solver = SUB_channel.Solver(segments,pIn,R_A) #once, drop-in for SUB_P6.Solver (same fun1 inputs & outputs)
+# Tpo,P6,ReD,PrP,Tb = solver.fun1(Dh,DmeanM,Lch,Aheat,mdot,mdotch,Tpi,TRAC,propellant,channellayout,NISTP,limitsP,MMP,Acs)
+# solver.pc                                     #[Pa], outlet pressure (replaces SUB_pLoss.fun1)
+# solver.local["Tp"], ["ReD"], ["Nu"], ["dp"]   #(channels,segments) local state of the last call (see fun1)
+#
+# Every channel is split in "segments" segments of length Lch/segments. Per segment: the propellant properties at the
+# bulk temperature of the segment, local ReD & PrP, the Nusselt number of SUB_P6.Nu (Stephan, Gnielinski (enhanced),
+# Kalb & Seader, Seban & McLaughlin; regime from the inflow Reynolds number and Dh/Lch of the whole channel, as in
+# SUB_P6), the outlet temperature from the transfer units of the segment, Tout = Tw-(Tw-Tin)*exp(-hP*A/(mdotch*cp)),
+# and the pressure drop of SUB_pLoss over the segment length at the local temperature & pressure.
+# TRAC (the wall temperature) is a float, an array per segment (segments,) or per channel & segment (channels,segments);
+# mdotch is a float (mdot/mdotch equal channels) or an array per channel (uneven flow distribution).
+#
+# All segments of all channels are evaluated at once: with the segment states fixed, the march is a linear recurrence,
+# solved in closed form from the cumulative transfer units; the states are updated in sweeps until the temperatures
+# change less than Ttol. A sweep that changes them more than the one before halves the relaxation of the updates, so
+# a state at a jump of the properties (water at 393.36 K) ends when the relaxed update is below Ttol. Warm started
+# from the profile & relaxation (doubled) of the previous call, a few sweeps per time step.
+
+import SUB_properties
+import SUB_pLoss
+import SUB_TtoH
+import SUB_P6
+
+import numpy as np
+
+
+class Solver:
+    ### Counters as SUB_P6.Solver: calls, it & nfev (sweeps), fallback (always 0) and failed (no convergence)
+
+    def __init__(self,segments,pIn,R_A,Ttol=1e-3,maxiter=50):
+        self.segments = int(segments)   #[-], segments per channel
+        self.tri = np.tri(self.segments,dtype=bool)     #[-], segments m up to segment k (of the march)
+        self.pIn,self.R_A = pIn,R_A     #[Pa] & [J/mol/K], inlet pressure & gas constant
+        self.Ttol,self.maxiter = Ttol,maxiter
+        self.Tp,self.p = None,None      #[K] & [Pa], profile of the previous call (warm start)
+        self.w = 1.0                    #[-], relaxation of the previous call
+        self.pc = pIn                   #[Pa], outlet pressure of the last call
+        self.local = None
+        self.u = None                   #[-], transfer units of the whole channel (mean over the channels)
+        self.calls,self.it,self.nfev,self.fallback,self.failed = 0,0,0,0,0
+
+    def fun1(self,Dh,DmeanM,Lch,Aheat,mdot,mdotch,Tpi,TRAC,propellant,channellayout,NISTP,limitsP,MMP,Acs):
+
+        S,pIn,R_A = self.segments,self.pIn,self.R_A
+        prop = SUB_properties.propellant(propellant)                                    #[-], cp, mu & k of the propellant
+        m = (np.full(int(round(mdot/mdotch)),float(mdotch)) if np.ndim(mdotch) == 0
+             else np.asarray(mdotch,dtype=float))[:,None]                               #[kg/s], (channels,1) mass flow per channel
+        nch = len(m)
+        Tw = np.broadcast_to(np.asarray(TRAC,dtype=float),(nch,S))                      #[K], wall temperature per segment
+        A = Aheat/nch/S                                                                 #[m2], heated wall area per segment
+        dL = Lch/S                                                                      #[m], segment length
+        lam,turb = SUB_P6.regime(m*Dh/(Acs*prop.mu(float(Tpi))),channellayout)          #[-], flow regime per channel
+
+        # Start: previous profile, else the propellant at the inflow state
+        if self.Tp is not None and self.Tp.shape == (nch,S):
+            Tp,p = self.Tp,self.p
+        else:
+            Tp,p = np.full((nch,S),float(Tpi)),np.full((nch,S),float(pIn))
+
+        ### Sweeps: local states from the profile, then the march & the pressure drops from the local states
+        ok,w,last = False,self.w,np.inf                                                 #[-], relaxation & previous change
+        for it in range(1,self.maxiter+1):
+            Tin = np.concatenate([np.full((nch,1),float(Tpi)),Tp[:,:-1]],axis=1)        #[K], inflow temperature per segment
+            pin = np.concatenate([np.full((nch,1),float(pIn)),p[:,:-1]],axis=1)         #[Pa], inflow pressure per segment
+            Tb = (Tin+Tp)/2                                                             #[K], bulk temperature per segment
+            mu,k = prop.muk(Tb)                                                         #[Pa s] & [W/m/K], viscosity & conductivity
+            cp = prop.cp(Tb)                                                            #[J/kg/K], heat capacity at constant pressure
+            PrP = mu*cp/k                                                               #[-], local Prandtl number
+            ReD = m*Dh/(Acs*mu)                                                         #[-], local Reynolds number
+            Nu = SUB_P6.Nu(ReD,PrP,Dh,DmeanM,Lch,channellayout,lam,turb)                #[-], local Nusselt number
+            hP = Nu*k/Dh                                                                #[W/m2/K], convective heat transfer coefficient
+            NTU = hP*A/(m*cp)                                                           #[-], transfer units per segment
+
+            # Tp[k] = a[k]*Tp[k-1]+(1-a[k])*Tw[k], a = exp(-NTU): weights exp(-(C[k]-C[m])) of segments m <= k
+            C = np.cumsum(NTU,axis=1)                                                   #[-], cumulative transfer units
+            W = np.exp(-np.where(self.tri,C[:,:,None]-C[:,None,:],np.inf))                   #[-], (channels,k,m)
+            Tnew = Tpi*np.exp(-C)+np.einsum('jkm,jm->jk',W,(1-np.exp(-NTU))*Tw)        #[K], outlet temperature per segment
+
+            dp = pin-SUB_pLoss.fun2(ReD,Dh,DmeanM,dL,channellayout,R_A,Tb,m,pin,MMP)    #[Pa], pressure drop per segment
+            pnew = pIn-np.cumsum(dp,axis=1)                                             #[Pa], outlet pressure per segment
+
+            change = np.max(np.abs(Tnew-Tp))                                            #[K], largest change of the sweep
+            if change < self.Ttol:
+                Tp,p,ok = Tnew,pnew,True
+                break
+            if change > last:
+                w /= 2
+            last = change
+            if w*change < self.Ttol: #relaxed update below the tolerance
+                ok = True
+                break
+            Tp,p = Tp+w*(Tnew-Tp),p+w*(pnew-p)
+
+        # Powers from the enthalpy rise (per segment, exact energy balance of the march)
+        N = nch*S
+        H = SUB_TtoH.fun2(np.broadcast_to(np.asarray(NISTP,dtype=float),(N,)+np.shape(NISTP)),
+                          np.broadcast_to(np.asarray(limitsP,dtype=float),(N,len(limitsP))),MMP,Tp.ravel(),np.full(N,float(Tpi)))
+        H = H.reshape(nch,S)                                                            #[J/kg], enthalpy rise up to every segment
+        P6 = m*np.diff(H,axis=1,prepend=0.0)                                            #[W], power to the propellant per segment
+        G = m*cp*(1-np.exp(-NTU))                                                       #[W/K], d(P6)/d(Tw) per segment
+
+        self.Tp,self.p,self.w = Tp,p,min(1.0,2*w)
+        self.pc = float(np.sum(m[:,0]*p[:,-1])/m.sum())                                 #[Pa], outlet pressure (mass-weighted)
+        self.u = float(np.mean(C[:,-1]))
+        self.local = {"z":(np.arange(S)+0.5)*dL,"Tw":Tw,"Tp":Tp,"Tb":Tb,"p":p,"dp":dp,"ReD":ReD,"PrP":PrP,"Nu":Nu,"h":hP,
+                      "NTU":NTU,"P6":P6,"G":G}
+        self.calls += 1
+        self.it += it
+        self.nfev += it
+        self.failed += not ok
+
+        Tpo = float(np.sum(m[:,0]*Tp[:,-1])/m.sum())                                    #[K], outlet temperature (mixed)
+        return(Tpo,float(P6.sum()),float(np.mean(ReD)),float(np.mean(PrP)),float(np.mean(Tb)))
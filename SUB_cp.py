@@ -4,6 +4,8 @@ July 2020
 A. Takken
 """
 
+import numpy as np
+
 def fun1(T,NIST,limits,MM):
 
     if T < limits[0]:
@@ -16,4 +18,17 @@ def fun1(T,NIST,limits,MM):
     cp = (NIST[0][ii]+NIST[1][ii]*T/1000+NIST[2][ii]*(T/1000)**2+NIST[3][ii]*(T/1000)**3+NIST[4][ii]/(T/1000)**2)/MM   
                      
     return(cp)
-    
\ No newline at end of file
+    
+
+def fun2(T,NIST,limits,MM):
+    ### Vectorized version of fun1 for batch runs
+    # T [K]: array (N,), NIST: array (N,5+,3) (segments padded to 3), limits: array (N,2+), MM: array (N,)
+
+    T = np.asarray(T,dtype=float)
+    ii = (T >= limits[:,0]).astype(int) + (T >= limits[:,1])                       #[-], NIST segment
+    c = NIST[np.arange(len(T)),:,ii]                                                #[-], coefficients of the segment
+    t = T/1000
+
+    cp = (c[:,0]+c[:,1]*t+c[:,2]*t**2+c[:,3]*t**3+c[:,4]/t**2)/MM
+
+    return(cp)
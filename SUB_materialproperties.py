@@ -93,4 +93,4 @@ def fun1(material):
         sigmayM = 550E6 #Yield strength [Pa]
         nameM = "Tungsten with white paint coating"
 
-    return(emM,absoM,T_maxM,NISTM,limitsM,MMM,rhoM,nameM)
\ No newline at end of file
+    return(emM,absoM,T_maxM,NISTM,limitsM,MMM,rhoM,nameM,kM)
\ No newline at end of file
@@ -0,0 +1,177 @@
+"""
+Monte Carlo uncertainty propagation over uncertain material, insulation, cavity & nozzle parameters
+July 2020
+A. Takken
+"""
+
+### Usage (the "if" is needed for the process pool on Windows)
+# import SUB_montecarlo
+# if __name__ == "__main__":
+#     out = SUB_montecarlo.run(config,samples=2000)          #config: one design (inputs as SUB_simulate.inputs())
+#     out["TRACmax"]                                          #{5: .., 50: .., 95: .., "mean": .., "std": ..}
+#     out["Ispmax"][95], out["bands"]["TRAC"][50]             #percentile bands of the time series (arrays per step)
+#
+# "uncertain" gives per parameter the distribution of its relative deviation, ("normal",sd) or ("uniform",half width):
+#   emM     material emissivity (also the outer wall emissivity without insulation)
+#   absoIC  absorptivity of the inner cavity (view factor losses)
+#   kfac    factor on the insulation conductivity (the Saffil M-Fil fit or kI)
+#   Cda,Cdb nozzle discharge coefficient relation (slope & intercept)
+#   ksiF    nozzle quality
+# Emissivity, absorptivity & nozzle quality are limited to 1. The realizations run as SUB_batch runs of "batch" designs
+# (over a process pool with workers > 1). Percentiles are estimated while the batches come in (P-square algorithm,
+# constant memory per percentile), so neither the realizations nor their time series are kept.
+
+import SUB_simulate
+import SUB_batch
+
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+uncertain = {"emM":("normal",0.10),"absoIC":("uniform",0.05),"kfac":("normal",0.15),
+             "Cda":("normal",0.05),"Cdb":("normal",0.01),"ksiF":("uniform",0.02)}
+summaries = ["TRACmax","Ispmax","Fmax","eta","Tpomax","pLossmax"]
+
+
+class P2:
+
+    ### Streaming estimate of percentile p [%] of a quantity of any shape (P-square algorithm of Jain & Chlamtac),
+    # update(x) with every new observation x, value() for the estimate. Five markers per element.
+
+    def __init__(self,p):
+        self.p = p/100.0
+        self.count = 0
+        self.first = []                                                 #[-], first five observations
+        self.dn = np.array([0.0,self.p/2,self.p,(1+self.p)/2,1.0])      #[-], increments of the desired positions
+
+    def update(self,x):
+        x = np.asarray(x,dtype=float)
+        self.count += 1
+        if self.count <= 5:
+            self.first.append(x)
+            if self.count == 5:
+                self.q = np.sort(np.array(self.first),axis=0)           #[-], marker heights
+                self.n = np.ones_like(self.q)*np.arange(1.0,6.0).reshape((5,)+(1,)*x.ndim)   #[-], marker positions
+                self.nd = 1+4*self.dn                                   #[-], desired positions
+            return
+        q,n = self.q,self.n
+        q[0],q[4] = np.minimum(q[0],x),np.maximum(q[4],x)
+        k = (x >= q[1]).astype(int)+(x >= q[2])+(x >= q[3])             #[-], cell of x (0-3)
+        for i in range(1,5):
+            n[i] += k < i
+        self.nd = self.nd+self.dn
+
+        ### Adjustment of the three middle markers (parabolic, else linear)
+        for i in range(1,4):
+            d = self.nd[i]-n[i]
+            move = ((d >= 1) & (n[i+1]-n[i] > 1)) | ((d <= -1) & (n[i-1]-n[i] < -1))
+            if not np.any(move):
+                continue
+            s = np.sign(d)
+            with np.errstate(divide='ignore',invalid='ignore'):
+                qp = q[i]+s/(n[i+1]-n[i-1])*((n[i]-n[i-1]+s)*(q[i+1]-q[i])/(n[i+1]-n[i])
+                                             +(n[i+1]-n[i]-s)*(q[i]-q[i-1])/(n[i]-n[i-1]))
+                ql = np.where(s > 0,q[i]+(q[i+1]-q[i])/(n[i+1]-n[i]),q[i]-(q[i-1]-q[i])/(n[i-1]-n[i]))
+            qn = np.where((q[i-1] < qp) & (qp < q[i+1]),qp,ql)
+            q[i] = np.where(move,qn,q[i])
+            n[i] = np.where(move,n[i]+s,n[i])
+
+    def value(self):
+        if self.count < 5: #exact for few observations
+            return(np.percentile(np.array(self.first),100*self.p,axis=0) if self.count else np.nan)
+        return(self.q[2].copy())
+
+
+def draw(n,uncertain,rng):
+    ### Relative deviations (n,) per uncertain parameter
+    factors = {}
+    for name,(kind,width) in uncertain.items():
+        if kind == "normal":
+            factors[name] = 1+width*rng.standard_normal(n)
+        elif kind == "uniform":
+            factors[name] = 1+width*rng.uniform(-1.0,1.0,n)
+        else:
+            raise ValueError("unknown distribution "+str(kind)+" for "+name)
+    return(factors)
+
+
+def chunk(config,factors,bands):
+    ### Runs the realizations with the given factors as one batch (in a worker process), summaries (& series)
+    N = len(next(iter(factors.values())))
+    configs = []
+    for r in range(N):
+        c = dict(config)
+        if "absoIC" in factors:
+            c["absoIC"] = min(1.0,config["absoIC"]*factors["absoIC"][r])
+        if "ksiF" in factors:
+            c["ksiF"] = min(1.0,config["ksiF"]*factors["ksiF"][r])
+        configs.append(c)
+    b = SUB_batch.setup(configs)
+    if "emM" in factors:
+        emM = np.minimum(1.0,b["emM"]*factors["emM"])
+        b["emO"] = np.where(b["insulation"] == 0,emM,b["emO"])                  #[-], outer wall emissivity without insulation
+        b["emM"] = emM
+    for name in ["kfac","Cda","Cdb"]:
+        if name in factors:
+            b[name] = b[name]*factors[name]
+    with np.errstate(invalid='ignore'):
+        out = SUB_batch.simulate(configs,b,keep=bands)
+    series = None
+    if bands: #steps after melting hold the last value
+        series = {}
+        for name in ["TRAC","Isp"]:
+            x = out["series"][name]
+            idx = np.maximum.accumulate(np.where(np.isnan(x),0,np.arange(len(x))[:,None]),axis=0)
+            series[name] = x[idx,np.arange(x.shape[1])]
+    return({name:out[name] for name in summaries+["melted"]},series)
+
+
+def run(config,samples=1000,uncertain=uncertain,percentiles=(5,50,95),batch=200,workers=1,bands=True,seed=0):
+    ### Monte Carlo over the uncertain parameters of one design
+    # returns per summary quantity the percentiles, mean & std, the fraction of melted realizations ("melted") and
+    # (bands) the percentiles of TRAC & Isp per time step in "bands", with the time [min] in "t"
+    config = dict(SUB_simulate.inputs(),**config)
+    rng = np.random.default_rng(seed)
+    factors = draw(samples,uncertain,rng)
+    parts = [{name:f[k:k+batch] for name,f in factors.items()} for k in range(0,samples,batch)]
+
+    est = {name:{p:P2(p) for p in percentiles} for name in summaries}
+    moments = {name:[0,0.0,0.0] for name in summaries}                  #[-], count, mean & sum of squared deviations
+    bandest = {name:{p:P2(p) for p in percentiles} for name in ["TRAC","Isp"]} if bands else None
+    melted = 0
+
+    def add(out,series):
+        ### Streams the realizations of one batch into the estimates
+        nonlocal melted
+        melted += int(np.sum(out["melted"]))
+        for name in summaries:
+            for x in out[name]: #Welford
+                m = moments[name]
+                m[0] += 1
+                delta = x-m[1]
+                m[1] += delta/m[0]
+                m[2] += delta*(x-m[1])
+                for e in est[name].values():
+                    e.update(x)
+        if bands:
+            for name in bandest:
+                for r in range(series[name].shape[1]):
+                    for e in bandest[name].values():
+                        e.update(series[name][:,r])
+
+    if workers == 1:
+        for part in parts:
+            add(*chunk(config,part,bands))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            jobs = [pool.submit(chunk,config,part,bands) for part in parts]
+            for job in as_completed(jobs):
+                add(*job.result())
+
+    result = {"samples":samples,"melted":melted/samples}
+    for name in summaries:
+        n,mean,M2 = moments[name]
+        result[name] = dict({p:float(e.value()) for p,e in est[name].items()},mean=float(mean),std=float(np.sqrt(M2/max(n-1,1))))
+    if bands:
+        result["bands"] = {name:{p:e.value() for p,e in bandest[name].items()} for name in bandest}
+        result["t"] = np.arange(int(config["n_t"]*3600/config["t_step"]))*config["t_step"]/60.0
+    return(result)
@@ -8,6 +8,7 @@ A. Takken
 #["Nitrogen","Water","Ammonia","Hydrogen"]
 
 import math
+import numpy as np
 
 def fun1(propellant,Tp):
     
@@ -38,3 +39,31 @@ def fun1(propellant,Tp):
             kP = a[propellant][1]*Tp + b[propellant][1]    
               
     return(muP,kP)
+
+
+def fun2(propellant,Tp):
+    ### Vectorized version of fun1 for batch runs
+    # propellant [-]: array (N,) of propellant identifiers, Tp [K]: array (N,)
+
+    mu0 = np.array([17.81e-6,0.0000,9.82e-6,8.76e-6])             #Sutherland's constants
+    Ts = np.array([111,0.0000,370,72])                          #Sutherland's constants
+    T0 = np.array([300.55,1.0000,293.15,293.85])                #Sutherland's constants (1.0 for water to avoid 0/0)
+    a = np.array([5.7326e-5,7.9792e-4,1.32783e-4,4.8422e-4])    #gradient, from NIST & Excel (water below 393.36 K)
+    b = np.array([0.0086744,0.36934,-0.014539,0.040601])        #intersect, from NIST & Excel (water below 393.36 K)
+
+    propellant = np.asarray(propellant,dtype=int)
+    Tp = np.asarray(Tp,dtype=float)
+    water = propellant == 1
+    liquid = Tp <= 393.36 #at 2 bar
+
+    ### muP
+    muP = mu0[propellant]*(T0[propellant]+Ts[propellant])/(Tp+Ts[propellant])*(Tp/T0[propellant])**(3/2)   #[Pa s], by Sutherland
+    muW = np.where(liquid,0.014075241*np.exp(-0.016737*Tp),4.06056e-8*Tp-3.00963e-6)                         #[Pa s], water, by NIST & Excel
+    muP = np.where(water,muW,muP)
+
+    ### kP
+    kP = a[propellant]*Tp + b[propellant]
+    kW = np.where(liquid,7.9792e-4*Tp+0.36934,1.1479e-4*Tp-0.017661)
+    kP = np.where(water,kW,kP)
+
+    return(muP,kP)
@@ -0,0 +1,193 @@
+"""
+Multi-node thermal network of the RAC along its length (wall, propellant & insulation nodes)
+July 2020
+A. Takken
+"""
+
+### Usage
+# config["nodes"] = 40                          #SUB_simulate.simulate runs the network instead of the single RAC mass
+# result = SUB_simulate.simulate(config)        #same outputs as the lumped loop ("T": mean wall temperature, ...)
+# result["network"]["Tw"]                       #[K], (steps,nodes) wall temperatures, also "Tp" (propellant) & "Ti"
+#
+# The RAC (length LcavA, aperture at z = 0) is split in "nodes" wall nodes of mass MRAC/nodes, coupled by axial
+# conduction through the wall (kM, cross-section MRAC/rhoM/LcavA). Every wall node gets its share of the absorbed power
+# and of the inner (P4, P5) & outer (P1, P2) wall areas. With insulation, every wall node has an insulation node: its
+# outer surface temperature from the balance P3 = P1+P2 of SUB_P123 (massless, the heat capacity of Saffil M-Fil is
+# unknown). The channels run along the first LcavC of the RAC (propellant entering at z = 0), with one propellant
+# node per wall node: the propellant is marched through the nodes with the number of transfer units of SUB_P6 (u,
+# solved at the mean channel wall temperature) split evenly over them, Tp[k] = Tw[k]-(Tw[k]-Tp[k-1])*exp(-u/nc).
+# With config["segments"] the propellant is marched through the channel segments of SUB_channel instead, every segment
+# at the temperature of the wall node it passes ("Tp" per segment).
+#
+# Time stepping: the conduction is implicit, the power terms are linearized around the wall temperatures at the start
+# of the step (semi-implicit Euler), giving one tridiagonal (banded) system per step (scipy.linalg.solve_banded).
+#
+# With config["output"] the time series is streamed in chunks of "chunk" steps as in the fixed loop (SUB_output), the
+# node temperatures to "<output>.network.npy" (fields Tw0.., Tp0.., Ti0..), both memory-mapped in the result.
+
+import SUB_schedule
+import SUB_output
+import SUB_nozzle
+import SUB_pLoss
+import SUB_P123
+import SUB_P4
+import SUB_P6
+import SUB_TtoH
+import SUB_channel
+
+import numpy as np
+from scipy.linalg import solve_banded
+from scipy.signal import lfilter
+
+
+def path(output):
+    ### File of the node temperatures next to the time series file "output"
+    return(output[:-4]+".network.npy" if output.endswith(".npy") else output+".network.npy")
+
+
+def fun1(c,case):
+    ### Transient loop of the network, c: full config (with "nodes"), case: SUB_simulate.setup(c)
+    N = int(c["nodes"])
+    t_step,Tamb,pamb,pIn,Tpi = c["t_step"],c["Tamb"],c["pamb"],c["pIn"],c["Tpi"]
+    g0,R_A,sigma,MMP = case["g0"],case["R_A"],case["sigma"],case["MMP"]
+    propP,propM,T_maxM = case["propP"],case["propM"],case["T_maxM"]
+    LcavA = c["LcavA"]                                                          #[m], length of the RAC (without insulation)
+
+    # Nodes
+    z = (np.arange(N)+0.5)*LcavA/N                                              #[m], node positions (from the aperture)
+    Mn = case["MRAC"]/N                                                         #[kg], mass per wall node
+    Aw = case["MRAC"]/case["rhoM"]/LcavA                                        #[m2], wall cross-section for conduction
+    kc = case["kM"]*Aw/(LcavA/N)                                                #[W/K], conductance between wall nodes
+    nc = min(N,max(1,int(round(N*c["LcavC"]/LcavA))))                           #[-], nodes along the channels
+    ch = np.arange(N) < nc                                                      #[-], channel nodes
+    S = int(c["segments"])                                                      #[-], channel segments (SUB_channel), 0: none
+    seg = np.minimum(((np.arange(S)+0.5)/S*c["LcavC"]/(LcavA/N)).astype(int),N-1)  #[-], wall node of every segment
+    NISTn = np.broadcast_to(np.asarray(case["NISTP"],dtype=float),(nc,)+np.shape(case["NISTP"]))  #[-], NIST fit per channel node
+    limitsn = np.broadcast_to(np.asarray(case["limitsP"],dtype=float),(nc,len(case["limitsP"])))
+
+    # Preallocated outputs (lumped quantities as in SUB_simulate.simulate & the node temperatures), all steps or chunks
+    # of "chunk" steps streamed to "output"
+    n = int(c["n_t"]*3600/t_step)
+    m = n if c["output"] is None else min(n,c["chunk"])
+    K = S if S else nc                                                          #[-], propellant nodes (or segments)
+    names = ["Tw%d" % k for k in range(N)]+["Tp%d" % k for k in range(K)]+["Ti%d" % k for k in range(N)]
+    writers = None if c["output"] is None else (SUB_output.Writer(c["output"]),SUB_output.Writer(path(c["output"]),names))
+    M = np.zeros((m,len(SUB_output.columns)))
+    Tw = np.full(N,float(c["TRAC"]))                                            #[K], wall temperatures
+    nodes = np.zeros((m,2*N+K))                                                 #[K], Tw, Tp & Ti of the steps in the chunk
+    TwM,TpM,TiM = nodes[:,:N],nodes[:,N:N+K],nodes[:,N+K:]
+    i0 = 0                                                                      #[-], first step in the chunk
+
+    P6solver = SUB_channel.Solver(S,pIn,R_A) if S else SUB_P6.Solver()         #[-], bulk temperature solver (warm started)
+    P123solver = SUB_P123.Solver()              #[-], outer wall solver (warm started every step)
+    melted = False
+    ReT,Cd,At,Ae,h123,h4 = 0.0,0.0,0.0,0.0,0.0,0.0
+    i = 0
+    for i0S,i1S,f,mdot in SUB_schedule.fun2(c): #segments of constant irradiation & mass flow (SUB_schedule)
+        Pn = f*case["Pin"]/N                                                    #[W], absorbed power per wall node
+        flow = mdot > 0
+        if flow:
+            mdotch = mdot/c["nch"]
+            rho = pIn/(R_A/MMP*Tpi)                                             #[kg/m3], inflow density
+            vR = mdotch/rho/case["Acs"]/(175*(1/rho)**0.43)                     #[-], end velocity over maximum velocity
+        else: #no propellant flow (as in SUB_simulate.simulate)
+            ReT,Cd = 0.0,0.0
+        for i in range(i0S,i1S):
+
+            ### P1, P2 and P3 (insulation nodes), P4 & P5 per wall node
+            P1,P2,P3,Ti,h = P123solver.fun2(case["DouterA"],c["DouterM"],c["RACtype"],case["ARACo"]/N,case["emO"],Tw,Tamb,pamb,
+                                            g0,R_A,sigma,case["kI"],c["insulation"],case["LcavA"]/N)
+            h123 = float(np.mean(h))
+            if pamb < 0.5: #if vacuum
+                P4 = np.zeros(N)
+            else:
+                P4,h4 = SUB_P4.fun1(case["LsI"],case["ARACi"]/N,Tw,Tamb,pamb,g0,R_A)
+                h4 = float(np.mean(h4))
+            P5 = case["emM"]*sigma*case["ARACi"]/N*(Tw**4-Tamb**4)*case["RlossE"]
+
+            ### Linearized losses [W/K] of every wall node (convection & radiation)
+            dT = Tw-Tamb
+            with np.errstate(divide='ignore',invalid='ignore'):
+                G = np.where(dT != 0,(P1+P4)/dT+4*(P2+P5)*Tw**3/(Tw**4-Tamb**4),0.0)
+            G = np.maximum(G,0.0)
+
+            ### P6. Propellant nodes, marched through the channel nodes
+            P6 = np.zeros(N)
+            Tp = np.full(TpM.shape[1],Tpi)                                      #[K], propellant temperature after every node
+            Tpo,pc,F,Isp,ReD,PrP,v = Tpi,pIn,0.0,0.0,0.0,0.0,0.0
+            if flow and S: #channel segments, each on the wall node it passes
+                Tpo,P60,ReD,PrP,Tb = P6solver.fun1(c["Dh"],c["DmeanM"],case["Lch"],case["Aheat"],mdot,mdotch,Tpi,Tw[seg],c["propellant"],
+                                                   c["channellayout"],case["NISTP"],case["limitsP"],MMP,case["Acs"])
+                local = P6solver.local
+                P6 = np.bincount(seg,weights=local["P6"].sum(axis=0),minlength=N)  #[W], power to the propellant per node
+                G += np.bincount(seg,weights=local["G"].sum(axis=0),minlength=N)
+                Tp = local["Tp"].mean(axis=0)                                   #[K], propellant temperature after every segment
+                pc = P6solver.pc
+            elif flow:
+                Twc = float(np.mean(Tw[ch]))                                    #[K], mean channel wall temperature
+                Tpo0,P60,ReD,PrP,Tb = P6solver.fun1(c["Dh"],c["DmeanM"],case["Lch"],case["Aheat"],mdot,mdotch,Tpi,Twc,c["propellant"],
+                                                    c["channellayout"],case["NISTP"],case["limitsP"],MMP,case["Acs"])
+                u = P6solver.u if P6solver.u is not None else 0.0              #[-], number of transfer units of the channels
+                a = np.exp(-u/nc)                                               #[-], propellant temperature kept per node
+                Tp = lfilter([1-a],[1,-a],Tw[ch],zi=[a*Tpi])[0]                 #[K], Tp[k] = a*Tp[k-1]+(1-a)*Tw[k]
+                Tin = np.concatenate([[Tpi],Tp[:-1]])                           #[K], propellant temperature into every node
+                H = SUB_TtoH.fun2(NISTn,limitsn,MMP,Tp,np.full(nc,Tpi))         #[J/kg], enthalpy rise up to every node
+                P6[ch] = mdot*np.diff(H,prepend=0.0)                            #[W], power to the propellant per node
+                G[ch] += mdot*propP.cp((Tin+Tp)/2)*(1-a)
+                Tpo = float(Tp[-1])                                             #[K], outlet temperature
+                pc = SUB_pLoss.fun1(ReD,c["Dh"],c["DmeanM"],case["Lch"],c["channellayout"],R_A,float(np.mean((Tin+Tp)/2)),mdotch,pIn,MMP)
+            if flow:
+                F,Isp,ReT,At,Ae,Cd = SUB_nozzle.fun1(pc,mdot,R_A,MMP,Tpo,pamb,g0,c["propellant"],case["NISTP"],case["limitsP"],
+                                                     c["pe_min"],c["ksiF"],case["Cda"],case["Cdb"])
+                v = vR
+
+            ### P7. Semi-implicit step of the wall nodes: (C/dt+G+K) dT = Pin-losses-P6-K*Tw
+            P7 = Pn-(P1+P2+P4+P5+P6)                                            #[W], power to heat every wall node
+            C = Mn*propM.cp(Tw)                                                 #[J/K], heat capacity of every wall node
+            ab = np.zeros((3,N))
+            ab[1] = C/t_step+G
+            if N > 1:
+                ab[0,1:] = -kc
+                ab[2,:-1] = -kc
+                ab[1,1:] += kc
+                ab[1,:-1] += kc
+            rhs = P7.copy()
+            if N > 1:
+                rhs[1:] += kc*(Tw[:-1]-Tw[1:])
+                rhs[:-1] += kc*(Tw[1:]-Tw[:-1])
+            Tw = Tw+solve_banded((1,1),ab,rhs)                                  #[K], resulting wall temperatures
+
+            ### Saves
+            j = i-i0
+            M[j,0] = i*t_step/60.0
+            M[j,1:9] = case["Pin"],P1.sum(),P2.sum(),P3.sum(),P4.sum(),P5.sum(),P6.sum(),P7.sum()
+            M[j,9:12] = Tw.mean(),Ti.mean(),Tpo
+            M[j,12:18] = pc,F,Isp,v,ReD,PrP
+            TwM[j],TpM[j],TiM[j] = Tw,Tp,Ti
+            if j == m-1 and writers is not None: #chunk full
+                writers[0].write(M)
+                writers[1].write(nodes)
+                i0 += m
+
+            ### Exceeding material melting temperature
+            if Tw.max() > T_maxM:
+                melted = True
+                break
+        if melted:
+            break
+    i = i+1 if melted else n
+
+    if writers is None:
+        M,nodes = M[:i],nodes[:i]
+    else:
+        writers[0].write(M[:i-i0])
+        writers[1].write(nodes[:i-i0])
+        for writer in writers:
+            writer.close()
+        M = SUB_output.load(c["output"]).view("<f8").reshape(i,len(SUB_output.columns))
+        nodes = SUB_output.load(path(c["output"])).view("<f8").reshape(i,len(names))
+    TwM,TpM,TiM = nodes[:,:N],nodes[:,N:N+K],nodes[:,N+K:]
+    result = SUB_output.result(M)
+    result.update(ReT=ReT,Cd=Cd,At=At,Ae=Ae,h123=h123,h4=h4,melted=melted,P6solver=P6solver,P123solver=P123solver,case=case,
+                  network={"z":z,"Tw":TwM,"Tp":TpM,"Ti":TiM,"channel":ch})
+    return(result)
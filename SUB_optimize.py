@@ -0,0 +1,179 @@
+"""
+Design optimizer (differential evolution) on top of the batch solver, with constraints and a design cache
+July 2020
+A. Takken
+"""
+
+### Usage (the "if" is needed for the process pool on Windows)
+# import SUB_optimize
+# if __name__ == "__main__":
+#     space = {"channellayout":[0,1],"Dh":(0.0004,0.0008),"nch":(6,16),"pitch":(0.01,0.03),"tI":(0.01,0.05)}
+#     best = SUB_optimize.run(space,objective="Ispmax",base={"insulation":1},pLossmax=2e5,workers=4)
+#     best["design"], best["summary"], best["feasible"]
+#     SUB_optimize.save(best["cache"],"designs.json")     #evaluated designs, reused by run(...,cache=load("designs.json"))
+#
+# space: continuous (lower,upper) floats, integer (lower,upper) ints or a list of choices per input.
+# objective: "Ispmax" (max Isp [s]) or "eta" (thermal efficiency P6/PinR), maximized.
+# Constraints, as checked in the time loop: TRAC below the melting temperature T_maxM (no melting), v/vmax < 1,
+# choked flow in every step and (optional) the pressure loss below "pLossmax" [Pa]. A feasible design beats an
+# infeasible one, infeasible designs are ranked by their constraint violation.
+# The new designs of a population are split over the worker processes: a worker with at least "batch" designs runs them
+# in one SUB_batch run, else as separate SUB_simulate runs (the lockstep batch is slower for a few designs, see
+# SUB_batch). Designs already in the cache are not run again (the key is a hash of "base" & the design inputs, without
+# the defaults, see SUB_sweep.key).
+# "base" holds the other inputs (e.g. a larger "t_step" for screening).
+
+import SUB_simulate
+import SUB_batch
+import SUB_sweep
+
+import SUB_properties
+
+import io
+import os
+import json
+import contextlib
+import numpy as np
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+
+names = ["TRACmax","Ispmax","Fmax","eta","Tpomax","pLossmax","vRmax","ReDmin","ReDmax","Dt","De"]  #summary values kept
+
+
+def evaluate(configs,batch=100):
+    ### Summary & constraint values of a list of designs (in a worker process): one SUB_batch run from "batch" designs,
+    ### else separate SUB_simulate runs
+    if len(configs) < batch:
+        return([single(config) for config in configs])
+    b = SUB_batch.setup(configs)
+    with np.errstate(invalid='ignore'):
+        out = SUB_batch.simulate(configs,b)
+    rows = []
+    for i in range(len(configs)):
+        row = {name:float(out[name][i]) for name in names}
+        row.update(T_maxM=float(b["T_maxM"][i]),melted=bool(out["melted"][i]),unchoked=bool(out["unchoked"][i]))
+        rows.append(row)
+    return(rows)
+
+
+def single(config):
+    ### Summary & constraint values of one design (SUB_simulate run), the same values as evaluate
+    c = dict(SUB_simulate.inputs(),**config)
+    with contextlib.redirect_stdout(io.StringIO()), np.errstate(invalid='ignore'): #no "Not choked flow!" prints
+        result = SUB_simulate.simulate(c)
+    s = SUB_simulate.summary(c,result)
+    row = {name:float(s.get(name,np.nan)) for name in names}
+    if not s["flow"]:
+        row.update(Tpomax=float(c["Tpi"]),eta=0.0,Ispmax=0.0,Fmax=0.0,pLossmax=0.0,vRmax=0.0,ReDmin=0.0,ReDmax=0.0,Dt=0.0,De=0.0)
+
+    # Choked flow in every step with flow (critical pressure ratio of SUB_nozzle at the outlet temperature)
+    flow = result["Isp"] > 0.0
+    Tpo,pc = result["T"][flow,2],result["pc"][flow]
+    cp = SUB_properties.propellant(c["propellant"]).cp(Tpo)                    #[J/kg/K], specific heat at constant pressure
+    gamma = cp/(cp-result["case"]["R_A"]/result["case"]["MMP"])                #[-], specific heat ratio
+    unchoked = bool(np.any(c["pamb"] > (2/(gamma+1))**(gamma/(gamma-1))*pc))
+    row.update(T_maxM=float(result["case"]["T_maxM"]),melted=bool(result["melted"]),unchoked=unchoked)
+    return(row)
+
+
+def violation(row,pLossmax=None):
+    ### Constraint violation of an evaluated design [-] (0 for a feasible design)
+    v = max(0.0,row["TRACmax"]/row["T_maxM"]-1)+float(row["melted"])   #RAC temperature below the melting temperature
+    v += max(0.0,row["vRmax"]-1)                                        #v/vmax < 1
+    v += float(row["unchoked"])                                         #choked flow
+    if pLossmax is not None:
+        v += max(0.0,row["pLossmax"]/pLossmax-1)                        #pressure loss
+    return(v)
+
+
+def best(f,v):
+    ### Index of the best design: highest objective f of the feasible designs, else the lowest violation v
+    return(int(np.argmin(np.where(v == 0,-f,np.inf))) if np.any(v == 0) else int(np.argmin(v)))
+
+
+def decode(space,x):
+    ### Inputs of a design from its position x in [0,1] per input
+    design = {}
+    for (name,values),xi in zip(space.items(),x):
+        if isinstance(values,list): #choices
+            design[name] = values[min(int(xi*len(values)),len(values)-1)]
+        elif all(isinstance(v,int) for v in values): #integer
+            design[name] = int(round(values[0]+xi*(values[1]-values[0])))
+        else: #continuous
+            design[name] = float(values[0]+xi*(values[1]-values[0]))
+    return(design)
+
+
+def run(space,objective="Ispmax",base=None,pLossmax=None,population=16,generations=20,F=0.7,CR=0.9,seed=0,
+        workers=None,cache=None,batch=100):
+    ### Maximizes the objective over the design space (differential evolution, rand/1/bin)
+    # batch: least designs per worker for a SUB_batch run (see evaluate)
+    # returns the best design, its summary, its feasibility, the best objective per generation and the cache
+    if objective not in ["Ispmax","eta"]:
+        raise ValueError("objective must be \"Ispmax\" or \"eta\"")
+    given = base or {}                      #inputs given by the user (key)
+    base = dict(SUB_simulate.inputs(),**given)
+    cache = {} if cache is None else cache
+    rng = np.random.default_rng(seed)
+    d = len(space)
+    workers = workers or os.cpu_count()
+    runs = [0]
+
+    def score(X):
+        ### (objective, violation) of the designs X (population,d), new designs run in parallel (see evaluate)
+        designs = [decode(space,x) for x in X]
+        configs = [dict(base,**design) for design in designs]
+        keys = [SUB_sweep.key(dict(given,**design)) for design in designs]
+        todo = list(dict((k,config) for k,config in zip(keys,configs) if k not in cache).items())
+        if todo:
+            runs[0] += len(todo)
+            parts = [todo[i::workers] for i in range(workers) if todo[i::workers]]
+            if len(parts) == 1:
+                results = [evaluate([config for k,config in parts[0]],batch)]
+            else:
+                with ProcessPoolExecutor(max_workers=len(parts)) as pool:
+                    results = list(pool.map(partial(evaluate,batch=batch),[[config for k,config in part] for part in parts]))
+            for part,rows in zip(parts,results):
+                for (k,config),row in zip(part,rows):
+                    cache[k] = row
+        f = np.array([cache[k][objective] for k in keys])
+        v = np.array([violation(cache[k],pLossmax) for k in keys])
+        return(np.nan_to_num(f,nan=-np.inf),v,keys)
+
+    def better(f1,v1,f2,v2):
+        ### Feasibility rules: feasible over infeasible, then the objective (feasible) or the violation (infeasible)
+        return(np.where((v1 == 0) & (v2 == 0),f1 >= f2,v1 <= v2))
+
+    X = rng.random((population,d))
+    f,v,keys = score(X)
+    history = []
+    for g in range(generations):
+        ### Mutation & crossover
+        idx = np.array([rng.choice([j for j in range(population) if j != i],3,replace=False) for i in range(population)])
+        M = np.clip(X[idx[:,0]]+F*(X[idx[:,1]]-X[idx[:,2]]),0.0,1.0)
+        cross = rng.random((population,d)) < CR
+        cross[np.arange(population),rng.integers(0,d,population)] = True
+        T = np.where(cross,M,X)
+
+        ### Selection
+        fT,vT,keysT = score(T)
+        keep = better(fT,vT,f,v)
+        X,f,v = np.where(keep[:,None],T,X),np.where(keep,fT,f),np.where(keep,vT,v)
+        keys = [kT if k else k0 for kT,k0,k in zip(keysT,keys,keep)]
+        history.append(f[best(f,v)])
+
+    i = best(f,v)
+    return({"design":decode(space,X[i]),"summary":cache[keys[i]],"objective":f[i],"feasible":bool(v[i] == 0),
+            "violation":v[i],"history":np.array(history),"runs":runs[0],"cache":cache})
+
+
+def save(cache,path):
+    ### Evaluated designs to a JSON file
+    with open(path,"w") as f:
+        json.dump(cache,f)
+
+
+def load(path):
+    ### Evaluated designs saved by save()
+    with open(path) as f:
+        return(json.load(f))
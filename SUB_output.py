@@ -0,0 +1,79 @@
+"""
+Streaming output of the time series to a binary (.npy) file
+July 2020
+A. Takken
+"""
+
+### Usage
+# config["output"] = "run1.npy"               #SUB_simulate.simulate streams the time series to run1.npy (constant memory)
+# data = SUB_output.load("run1.npy")          #memory-mapped, no parsing: data["TRAC"], data["Isp"], ...
+# result = SUB_output.result(data)            #same arrays as SUB_simulate.simulate (t, P, T, pc, F, Isp, vR, ReD, PrP)
+#
+# The file is a standard .npy file (np.load works) with one float64 field per column. The header is rewritten with the
+# number of rows when the writer is flushed or closed, the rows are appended in chunks in between. Writer(...,rows=k)
+# reopens a file and continues after its first k rows, e.g. a column store that grows per case (see SUB_sweep).
+
+import numpy as np
+
+columns = ["t","Pin","P1","P2","P3","P4","P5","P6","P7","TRAC","Tinsu","Tpo","pc","F","Isp","vR","ReD","PrP"]
+dtype = np.dtype([(name,"<f8") for name in columns])
+
+
+class Writer:
+
+    def __init__(self,path,names=None,fmt="<f8",rows=None):
+        # names & fmt: fields & their format (default "columns", float64), rows: None for a new file, else the number of
+        # rows of the existing file that are kept (the rest, e.g. of an interrupted write, is cut off)
+        self.path = path
+        self.dtype = dtype if names is None else np.dtype([(name,fmt) for name in names])
+        self.header = -(-(10+len(self.dict(10**19))+1)//64)*64      #[bytes], fixed header length (room for any number of rows)
+        if rows is None:
+            self.rows = 0
+            self.f = open(path,"wb")
+        else:
+            self.rows = rows
+            self.f = open(path,"r+b")
+            self.f.truncate(self.header+rows*self.dtype.itemsize)
+        self.head()
+
+    def dict(self,rows):
+        return("{'descr': %s, 'fortran_order': False, 'shape': (%d,), }" % (repr(self.dtype.descr),rows))
+
+    def head(self):
+        ### (Re)writes the .npy header (version 1.0) for the current number of rows
+        d = self.dict(self.rows).ljust(self.header-10-1)+"\n"
+        self.f.seek(0)
+        self.f.write(np.lib.format.magic(1,0)+np.uint16(len(d)).tobytes()+d.encode("latin1"))
+        self.f.seek(0,2)
+
+    def write(self,block):
+        ### Appends rows, block: array (k,18) in the order of "columns" (or of "names")
+        block = np.ascontiguousarray(block,dtype=self.dtype[0])
+        self.f.write(block.tobytes())
+        self.rows += len(block)
+
+    def flush(self):
+        ### Header with the rows written so far (a valid file while writing)
+        self.head()
+        self.f.flush()
+
+    def close(self):
+        self.head()
+        self.f.close()
+
+    def __enter__(self):
+        return(self)
+
+    def __exit__(self,*args):
+        self.close()
+
+
+def load(path):
+    ### Memory-mapped table of a file written by Writer (fields as in "columns")
+    return(np.load(path,mmap_mode="r"))
+
+
+def result(data):
+    ### Time series of a loaded file with the names & shapes of SUB_simulate.simulate (views, no copies)
+    a = data.view("<f8").reshape(len(data),len(columns))
+    return({"t":a[:,0],"P":a[:,1:9],"T":a[:,9:12],"pc":a[:,12],"F":a[:,13],"Isp":a[:,14],"vR":a[:,15],"ReD":a[:,16],"PrP":a[:,17]})
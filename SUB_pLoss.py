@@ -21,4 +21,17 @@ def fun1(ReD,Dh,DmeanM,Lch,channellayout,R_A,Tb,mdotch,pIn,MMP):
     pLoss = fDB*8*Lch*R_A*Tb*mdotch**2/(np.pi**2*pIn*MMP*Dh**5)     #[Pa], pressure loss
     
     return(pIn-pLoss)
-    
\ No newline at end of file
+    
+
+def fun2(ReD,Dh,DmeanM,Lch,channellayout,R_A,Tb,mdotch,pIn,MMP):
+    ### Vectorized version of fun1 for batch runs (arrays (N,))
+    lam = ReD < 2300 #laminar flow
+    with np.errstate(invalid='ignore',divide='ignore'):
+        fDBs = np.where(lam,64/ReD,(0.790*np.log(ReD)-1.64)**-2)                                   #straight channels
+        fDBc = np.where(lam,(1+0.14*(Dh/DmeanM)**0.97*ReD)**(1-0.644*(Dh/DmeanM)**0.312)*64/ReD,    #spiral channels
+                        1.216*ReD**-0.25 + 0.116*(Dh/DmeanM)**0.5)
+    fDB = np.where(channellayout == 0,fDBs,fDBc)
+
+    pLoss = fDB*8*Lch*R_A*Tb*mdotch**2/(np.pi**2*pIn*MMP*Dh**5)     #[Pa], pressure loss
+
+    return(pIn-pLoss)
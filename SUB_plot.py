@@ -0,0 +1,107 @@
+"""
+Plots of the time series (post-processing, matplotlib is only imported here)
+July 2020
+A. Takken
+"""
+
+### Usage
+# SUB_plot.fun1(result)                          #figures of MASTER_PDT on screen
+# SUB_plot.fun1(result,plots="files",path="out")  #written to out/P.png, out/T.png, ... without a display (headless)
+# Series longer than "maxpoints" are downsampled before plotting: the steps are split in buckets and every bucket keeps
+# its minimum & maximum (in time order), so peaks are kept, first and last step included. Per plotted series.
+
+import os
+import numpy as np
+
+
+def downsample(y,maxpoints):
+    ### Indices of at most ~maxpoints of the steps of series y: minimum & maximum per bucket, first and last step
+    n = len(y)
+    k = max(1,int(np.ceil(2*n/maxpoints)))                  #[-], steps per bucket (two points per bucket)
+    if k == 1:
+        return(np.arange(n))
+    m = n//k*k                                              #[-], steps in full buckets
+    Y = np.asarray(y[:m],dtype=float).reshape(-1,k)
+    start = np.arange(0,m,k)
+    j = [[0,n-1],start+np.nanargmin(Y,axis=1),start+np.nanargmax(Y,axis=1)]
+    if m < n: #last, partial bucket
+        j.append(m+np.array([np.nanargmin(y[m:]),np.nanargmax(y[m:])]))
+    return(np.unique(np.concatenate(j)))
+
+
+def fun1(result,plots="show",path="plots",maxpoints=2000):
+    ### plots: "show" (on screen) or "files" (PNG files in the folder "path")
+    import matplotlib
+    if plots == "files":
+        matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    from matplotlib.ticker import (AutoMinorLocator, MultipleLocator)
+
+    iMatrix,PMatrix,TMatrix = result["t"],result["P"],result["T"]
+    pcMatrix,FMatrix,IspMatrix = result["pc"],result["F"],result["Isp"]
+    figures = []
+
+    def series(y):
+        ### Time & values of series y, downsampled
+        j = downsample(y,maxpoints)
+        return(iMatrix[j],y[j])
+
+    figures.append(("P",plt.figure(1)))
+    for k,label in enumerate(["Pin","P1","P2","P3","P4","P5","P6","P7"]):
+        plt.plot(*series(PMatrix[:,k]),label=label)
+    plt.grid()
+    axes = plt.gca()
+    axes.xaxis.set_major_locator(MultipleLocator(4))
+    axes.yaxis.set_major_locator(MultipleLocator(25))
+    axes.xaxis.set_minor_locator(AutoMinorLocator(2))
+    axes.yaxis.set_minor_locator(AutoMinorLocator(2))
+    axes.grid(which='major', color='#CCCCCC', linestyle='--')
+    axes.grid(which='minor', color='#CCCCCC', linestyle=':')
+    plt.xlabel("Time [min]")
+    plt.ylabel("P [W]")
+    plt.legend()
+
+    figures.append(("T",plt.figure(2)))
+    plt.plot(*series(TMatrix[:,0]),label="T_RAC from Python")
+    if max(IspMatrix) > 0.0:
+        plt.plot(*series(TMatrix[:,2]),label="Tp")
+    plt.grid()
+    axes = plt.gca()
+    axes.set_xlim([0,120])
+    axes.set_ylim([250,750])
+    axes.xaxis.set_major_locator(MultipleLocator(10))
+    axes.yaxis.set_major_locator(MultipleLocator(50))
+    axes.xaxis.set_minor_locator(AutoMinorLocator(2))
+    axes.yaxis.set_minor_locator(AutoMinorLocator(2))
+    axes.grid(which='major', color='#CCCCCC', linestyle='--')
+    axes.grid(which='minor', color='#CCCCCC', linestyle=':')
+    plt.xlabel("Time [min]")
+    plt.ylabel("T [K]")
+    plt.legend()
+
+    if max(IspMatrix) > 0.0:
+        figures.append(("F",plt.figure(3)))
+        plt.plot(*series(FMatrix),label="F")
+        plt.xlabel("Time [min]")
+        plt.ylabel("Thrust [N]")
+        plt.legend()
+
+        figures.append(("Isp",plt.figure(4)))
+        plt.plot(*series(IspMatrix),label="Isp")
+        plt.xlabel("Time [min]")
+        plt.ylabel("Isp [s]")
+        plt.legend()
+
+        figures.append(("pc",plt.figure(5)))
+        plt.plot(*series(pcMatrix),label="pc")
+        plt.xlabel("Time [min]")
+        plt.ylabel("Chamber pressure [Pa]")
+        plt.legend()
+
+    if plots == "files":
+        os.makedirs(path,exist_ok=True)
+        for name,fig in figures:
+            fig.savefig(os.path.join(path,name+".png"))
+            plt.close(fig)
+    else:
+        plt.show()
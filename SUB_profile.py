@@ -0,0 +1,88 @@
+"""
+Per-step profiling of the time loop (wall time per power term, solver iterations, fallbacks & failures)
+July 2020
+A. Takken
+"""
+
+### Usage
+# config["profile"] = True                      #opt-in, fixed time step loop of SUB_simulate (ValueError with
+#                                               #adaptive, implicit or nodes)
+# result = SUB_simulate.simulate(config)
+# result["profile"]["P6"]                       #[s], wall time of P6 in every step (rows as the time series)
+# SUB_profile.report(result)                    #totals per term & the steps where the solvers struggle
+#
+# Columns: wall time [s] of P1-P3 (SUB_P123), P4, P5, P6 (SUB_P6), the nozzle (SUB_pLoss & SUB_nozzle) and P7 (cp &
+# update), and per step the iterations, energy balance evaluations, fallbacks (Tpo set to TRAC, with SUB_TtoH) and
+# convergence failures of the P6 and P123 solvers. With config["output"] the profile is streamed next to the time
+# series, to "<output>.profile.npy" (read with SUB_output.load). Without "profile" the loop only reads no clock.
+
+import SUB_output
+
+import numpy as np
+
+columns = ["P123","P4","P5","P6","nozzle","P7",
+           "itP6","nfevP6","fallbackP6","failedP6","itP123","nfevP123","failedP123"]
+times = columns[:6]
+
+
+def path(output):
+    ### File of the profile next to the time series file "output"
+    return(output[:-4]+".profile.npy" if output.endswith(".npy") else output+".profile.npy")
+
+
+class Profiler:
+
+    def __init__(self,m,P6solver,P123solver,output=None):
+        self.M = np.zeros((m,len(columns)))             #[-], profile of the steps in the chunk
+        self.P6solver,self.P123solver = P6solver,P123solver
+        self.last = self.counters()
+        self.writer = None if output is None else SUB_output.Writer(path(output),columns)
+
+    def counters(self):
+        s,r = self.P6solver,self.P123solver
+        return(np.array([s.it,s.nfev,s.fallback,s.failed,r.it,r.nfev,r.failed],dtype=float))
+
+    def step(self,j,t0,t1,t2,t3,t4,t5,t6):
+        ### Saves step j of the chunk from the clock readings between the terms
+        row = self.M[j]
+        row[0],row[1],row[2],row[3],row[4],row[5] = t1-t0,t2-t1,t3-t2,t4-t3,t5-t4,t6-t5
+        now = self.counters()
+        row[6:] = now-self.last
+        self.last = now
+
+    def write(self,rows):
+        ### Writes the first rows of the chunk to the file (if any)
+        if self.writer is not None:
+            self.writer.write(self.M[:rows])
+
+    def close(self,rows):
+        ### Profile of all steps as a dict of columns (memory-mapped from the file with an output file)
+        if self.writer is None:
+            M = self.M[:rows]
+        else:
+            self.write(rows)
+            self.writer.close()
+            data = SUB_output.load(self.writer.path)
+            M = data.view("<f8").reshape(len(data),len(columns))
+        return({name:M[:,k] for k,name in enumerate(columns)})
+
+
+def report(result,top=5):
+    ### Prints the wall time per term, the solver totals and the slowest steps
+    p,t,T = result["profile"],result["t"],result["T"]
+    total = sum(p[name].sum() for name in times)
+    print("---------------")
+    print("Profiled steps:",len(t),"in","%.3f" % total,"[s]")
+    for name in times:
+        print("%-8s %9.3f [s] %6.1f [%%] %9.2f [us/step]" % (name,p[name].sum(),100*p[name].sum()/max(total,1e-300),
+                                                              1e6*p[name].mean() if len(t) else 0.0))
+    for solver in ["P6","P123"]:
+        it,nfev = p["it"+solver],p["nfev"+solver]
+        print("%s solver: %d iterations (max %d per step), %d evaluations, %d failures in %d solved steps"
+              % (solver,it.sum(),it.max() if len(t) else 0,nfev.sum(),p["failed"+solver].sum(),np.sum(nfev > 0)))
+    print("P6 fallbacks (Tpo set to TRAC): %d" % p["fallbackP6"].sum())
+    step = sum(p[name] for name in times)
+    for i in np.argsort(step)[::-1][:top]:
+        print("  slow step at t = %.2f [min], TRAC = %.1f [K]: %.1f [us], P6 iterations %d, fallback %d"
+              % (t[i],T[i,0],1e6*step[i],p["itP6"][i],p["fallbackP6"][i]))
+    print("---------------")
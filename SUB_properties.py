@@ -0,0 +1,124 @@
+"""
+Propellant & material property objects (cp, mu, k, Pr)
+July 2020
+A. Takken
+"""
+
+### Built once per propellant/material (propellant(i), material(i) keep them in "propellants" & "materials"),
+### shomate(NIST,limits,MM) builds the specific heat of given NIST coefficients once (kept in "shomates"),
+### the coefficients of SUB_NISTandconstants, SUB_muPandkP & SUB_materialproperties are fixed as arrays.
+### Every method takes a float (fast path without NumPy) or an array, segments are selected with np.searchsorted.
+### Same formulas as SUB_cp.fun1 and SUB_muPandkP.fun1.
+
+import SUB_NISTandconstants
+import SUB_materialproperties
+
+import math
+import numpy as np
+
+propellants = {}                #[-], Propellant objects per propellant identifier
+materials = {}                  #[-], Material objects per material identifier
+shomates = {}                   #[-], Shomate objects per NIST coefficients, limits & molar mass
+
+
+def propellant(i):
+    if i not in propellants:
+        propellants[i] = Propellant(i)
+    return(propellants[i])
+
+
+def material(i):
+    if i not in materials:
+        materials[i] = Material(i)
+    return(materials[i])
+
+
+def shomate(NIST,limits,MM):
+    key = (tuple(tuple(row) for row in NIST),tuple(limits[:2]),MM)
+    if key not in shomates:
+        shomates[key] = Shomate(NIST,limits,MM)
+    return(shomates[key])
+
+
+class Shomate:
+    ### Specific heat [J/kg/K] from NIST (Shomate) coefficients NIST[coefficient][segment] with limits [K]
+
+    def __init__(self,NIST,limits,MM):
+        c = np.array([row[:3] for row in NIST[:5]],dtype=float).T                 #[-], (segments,5)
+        self.c = np.concatenate([c]+[c[-1:]]*(3-len(c)))                          #[-], (3,5), padded with the last segment
+        self.cl = self.c.tolist()
+        self.limits = np.array(limits[:2],dtype=float)                              #[K], segment limits
+        self.l0,self.l1 = float(limits[0]),float(limits[1])
+        self.MM = MM                                                                #[kg/mol], molar mass
+
+    def cp(self,T):
+        if isinstance(T,(int,float)):
+            c = self.cl[0 if T < self.l0 else (1 if T < self.l1 else 2)]
+            return (c[0]+c[1]*T/1000+c[2]*(T/1000)**2+c[3]*(T/1000)**3+c[4]/(T/1000)**2)/self.MM
+        T = np.asarray(T,dtype=float)
+        c = self.c[np.searchsorted(self.limits,T,side='right')]
+        t = T/1000
+        return (c[...,0]+c[...,1]*t+c[...,2]*t**2+c[...,3]*t**3+c[...,4]/t**2)/self.MM
+
+
+class Propellant(Shomate):
+
+    def __init__(self,propellant):
+        g0,R_A,sigma,name,NISTP,limitsP,MMP = SUB_NISTandconstants.fun1(propellant)
+        Shomate.__init__(self,NISTP,limitsP,MMP)
+        self.propellant = propellant                            #[-], identifier
+        self.name = name
+        self.NIST,self.limitsNIST = NISTP,limitsP               #[-], as in SUB_NISTandconstants (for SUB_HtoT & SUB_TtoH)
+        self.R = R_A/MMP                                        #[J/kg/K], specific gas constant
+
+        # Viscosity & conductivity (see SUB_muPandkP), per segment: below and above Tw (only water has two)
+        self.water = propellant == 1
+        self.Tw = np.array([393.36]) if self.water else np.array([np.inf])     #[K], water at 2 bar
+        mu0 = [17.81e-6,0.0000,9.82e-6,8.76e-6]                 #Sutherland's constants
+        Ts = [111,0.0000,370,72]                                #Sutherland's constants
+        T0 = [300.55,0.0000,293.15,293.85]                      #Sutherland's constants
+        a = [5.7326e-5,[7.9792e-4,1.1479e-4],1.32783e-4,4.8422e-4]
+        b = [0.0086744,[0.36934,-0.017661],-0.014539,0.040601]
+        if self.water:
+            self.ka,self.kb = np.array(a[1]),np.array(b[1])     #[W/m/K], k = ka*T+kb
+        else:
+            self.mu0,self.Ts,self.T0 = mu0[propellant],Ts[propellant],T0[propellant]
+            self.ka,self.kb = np.array([a[propellant]]*2),np.array([b[propellant]]*2)
+        self.kal,self.kbl = self.ka.tolist(),self.kb.tolist()
+
+    def mu(self,T):
+        ### Dynamic viscosity [Pa s]
+        if self.water:
+            if isinstance(T,(int,float)):
+                return 0.014075241*math.exp(-0.016737*T) if T <= 393.36 else 4.06056e-8*T-3.00963e-6
+            T = np.asarray(T,dtype=float)
+            return np.where(T <= 393.36,0.014075241*np.exp(-0.016737*T),4.06056e-8*T-3.00963e-6)
+        if not isinstance(T,(int,float)):
+            T = np.asarray(T,dtype=float)
+        return self.mu0*(self.T0+self.Ts)/(T+self.Ts)*(T/self.T0)**(3/2)
+
+    def k(self,T):
+        ### Thermal conductivity [W/m/K]
+        if isinstance(T,(int,float)):
+            j = 0 if T <= self.Tw[0] else 1
+            return self.kal[j]*T+self.kbl[j]
+        T = np.asarray(T,dtype=float)
+        j = np.searchsorted(self.Tw,T,side='left')
+        return self.ka[j]*T+self.kb[j]
+
+    def muk(self,T):
+        ### Drop-in for SUB_muPandkP.fun1(propellant,T)
+        return(self.mu(T),self.k(T))
+
+    def Pr(self,T):
+        ### Prandtl number [-]
+        return self.mu(T)*self.cp(T)/self.k(T)
+
+
+class Material(Shomate):
+
+    def __init__(self,material):
+        emM,absoM,T_maxM,NISTM,limitsM,MMM,rhoM,nameM,kM = SUB_materialproperties.fun1(material)
+        Shomate.__init__(self,NISTM,limitsM,MMM)
+        self.material = material                                #[-], identifier
+        self.emM,self.absoM,self.T_maxM,self.rhoM,self.name,self.kM = emM,absoM,T_maxM,rhoM,nameM,kM
@@ -0,0 +1,106 @@
+"""
+Bracketed root finder (Illinois / regula falsi), vectorized
+July 2020
+A. Takken
+"""
+
+import numpy as np
+
+def fun1(f,a,b,xtol=1e-5,ftol=1e-9,maxiter=100,fa=None,fb=None,fjump=None):
+
+    ### Solves f(x) = 0 for x in [a,b] for arrays of independent problems
+    # f: function f(x,act) of the subset x = X[act] of the problems selected by the mask act (N,)
+    # a, b: arrays (N,), brackets. f(a) and f(b) should have opposite signs (fa, fb can be passed if already known)
+    # returns x, the number of iterations and a "converged" mask (False if no sign change, nan or maxiter reached)
+    # Only the unconverged problems are evaluated. A bracket that did not halve in two iterations is bisected, which
+    # bounds the iterations at a jump of f (no root, only the bracket width converges) to those of bisection.
+    # fjump: a problem with |f| above fjump at both ends of a bracket narrower than sqrt(xtol) is stopped as not
+    # converged (a jump of f, no root), instead of bisecting the jump down to xtol.
+
+    a = np.array(a,dtype=float,ndmin=1)
+    b = np.array(b,dtype=float,ndmin=1)
+    every = np.ones(len(a),dtype=bool)
+    fa = f(a,every) if fa is None else np.array(fa,dtype=float)
+    fb = f(b,every) if fb is None else np.array(fb,dtype=float)
+    ok = np.sign(fa)*np.sign(fb) <= 0                   #[-], valid brackets
+    x = np.where(np.abs(fa) < np.abs(fb),a,b)           #[-], best estimate
+    conv = (np.abs(fa) < ftol) | (np.abs(fb) < ftol)    #[-], converged problems
+    done = ~ok | conv
+    side = np.zeros(len(a),dtype=int)                   #[-], side kept in the last iteration (Illinois halving)
+    w1 = w2 = np.full(len(a),np.inf)                    #[-], bracket widths one & two iterations ago
+
+    it = 0
+    while not np.all(done) and it < maxiter:
+        it += 1
+        with np.errstate(divide='ignore',invalid='ignore'):
+            xn = b - fb*(b-a)/(fb-fa)                   #[-], secant through the bracket
+        bad = ~np.isfinite(xn) | (xn <= np.minimum(a,b)) | (xn >= np.maximum(a,b)) | (np.abs(b-a) > w2/2)
+        w1,w2 = np.abs(b-a),w1
+        xn = np.where(bad,(a+b)/2,xn)                   #[-], bisection as a safeguard
+        fn = np.full(len(a),np.nan)
+        act = ~done
+        fn[act] = f(xn[act],act)
+
+        left = act & (np.sign(fn) == np.sign(fa))       #root between xn and b
+        right = act & ~left                             #root between a and xn
+        # Illinois: halve the function value of the endpoint that is kept twice
+        fb = np.where(left & (side == 1),fb/2,fb)
+        fa = np.where(right & (side == -1),fa/2,fa)
+        a,fa = np.where(left,xn,a),np.where(left,fn,fa)
+        b,fb = np.where(right,xn,b),np.where(right,fn,fb)
+        side = np.where(left,1,np.where(right,-1,side))
+
+        x = np.where(act,xn,x)
+        conv = conv | (act & ((np.abs(fn) < ftol) | (np.abs(b-a) < xtol)))
+        done = done | conv | (act & np.isnan(fn))
+        if fjump is not None:
+            jump = act & ~conv & (np.abs(b-a) < np.sqrt(xtol)) & (np.abs(fa) > fjump) & (np.abs(fb) > fjump)
+            done = done | jump
+            ok = ok & ~jump
+        ok = ok & ~np.isnan(np.where(act,fn,0.0))
+
+    return(x,it,ok & conv)
+
+
+
+def fun2(f,a,b,fa=None,fb=None,xtol=1e-5,ftol=1e-9,maxiter=100):
+
+    ### Scalar version of fun1 (no array overhead), f(a) and f(b) can be passed if already known
+    # returns x, the number of iterations, the number of function evaluations and "converged" (False if no sign change or nan)
+
+    nfev = 0
+    if fa is None:
+        fa = f(a)
+        nfev += 1
+    if fb is None:
+        fb = f(b)
+        nfev += 1
+    if not fa*fb <= 0: #no sign change (or nan)
+        return(a if abs(fa) < abs(fb) else b,0,nfev,False)
+    if abs(fa) < ftol:
+        return(a,0,nfev,True)
+    if abs(fb) < ftol:
+        return(b,0,nfev,True)
+
+    side = 0
+    x = b
+    for it in range(1,maxiter+1):
+        x = b - fb*(b-a)/(fb-fa)                        #[-], secant through the bracket
+        if not min(a,b) < x < max(a,b):
+            x = (a+b)/2                                 #[-], bisection as a safeguard
+        fx = f(x)
+        nfev += 1
+        if fx != fx: #nan
+            return(x,it,nfev,False)
+        if fx*fa > 0: #root between x and b
+            if side == 1:
+                fb = fb/2                               #Illinois: halve the end point that is kept twice
+            a,fa,side = x,fx,1
+        else: #root between a and x
+            if side == -1:
+                fa = fa/2
+            b,fb,side = x,fx,-1
+        if abs(fx) < ftol or abs(b-a) < xtol:
+            return(x,it,nfev,True)
+
+    return(x,maxiter,nfev,False)
@@ -0,0 +1,89 @@
+"""
+Mission profile: burns & irradiation windows as segments of constant inputs
+July 2020
+A. Takken
+"""
+
+### Usage
+# config["n_i"] = [[0.0,1.0],[1.5,2.5]]                   #[h], irradiation windows (or a single [begin,end] as before)
+# config["PinR_i"] = [250.0,200.0]                        #[W], incoming irradiance power per window (None: "PinR" in all)
+# config["eclipse"] = SUB_schedule.orbits(95.0,35.0,4)    #[h], periods without irradiation (e.g. 4 orbits with eclipse)
+# config["mdot"],config["n_p"] = [300e-6,200e-6],[[0,30],[60,90]]   #[kg/s] & [min], burns (mass flow levels), as before
+#
+# SUB_schedule.fun1(config) gives the segments [(t0,t1,f,mdot),...] in [s], with f the absorbed power as a fraction of
+# the absorbed power of "PinR" (0 without irradiation) and mdot the mass flow [kg/s] (0 without flow).
+# SUB_schedule.fun2(config) gives the same as step ranges [(i0,i1,f,mdot),...] of the fixed time step: step i is in a
+# segment if its time i*t_step is in [t0,t1). The time loops run every segment without checking the schedule per step.
+# Where windows overlap, the first burn (in the order of "mdot") and the first irradiation window count.
+# With PinR = 0 the windows of PinR_i can only be 0 (ValueError otherwise), as f scales the absorbed power of PinR.
+
+import math
+
+
+def windows(n):
+    ### List of [begin,end] windows, a single [begin,end] is one window
+    if len(n) == 2 and not hasattr(n[0],"__len__"):
+        return([list(n)])
+    return([list(w) for w in n])
+
+
+def orbits(period,eclipse,norbits,start=0.0):
+    ### Eclipse windows [h] of norbits orbits with a period and eclipse duration in [min], eclipse at the end of every orbit
+    return([[(start+(k+1)*period-eclipse)/60.0,(start+(k+1)*period)/60.0] for k in range(norbits)])
+
+
+def fun1(c):
+    ### Segments of constant absorbed power & mass flow [s]
+    t_end = c["n_t"]*3600                                                           #[s], end time
+    irradiation = [[b*3600,e*3600] for b,e in windows(c["n_i"])]                    #[s], irradiation windows
+    eclipse = [[b*3600,e*3600] for b,e in windows(c.get("eclipse",[]))]           #[s], eclipse windows
+    burns = [[b*60.0,e*60.0] for b,e in windows(c["n_p"])] if len(c["n_p"]) else []    #[s], burn windows
+    PinR_i = c.get("PinR_i")
+    if len(burns) != len(c["mdot"]):
+        raise ValueError("n_p needs one [begin,end] per mass flow level in mdot")
+    if PinR_i is not None and len(PinR_i) != len(irradiation):
+        raise ValueError("PinR_i needs one power per irradiation window in n_i")
+    if PinR_i is not None and c["PinR"] == 0 and any(P != 0 for P in PinR_i):
+        raise ValueError("PinR_i needs PinR > 0 (the absorbed power of a window is scaled from that of PinR)")
+
+    def state(t):
+        ### Absorbed power fraction & mass flow at time t [s]
+        f = 0.0
+        if not any(b <= t < e for b,e in eclipse):
+            for k,(b,e) in enumerate(irradiation):
+                if b <= t < e:
+                    f = 1.0 if PinR_i is None else (PinR_i[k]/c["PinR"] if PinR_i[k] != 0 else 0.0)
+                    break
+        mdot = 0.0
+        for m,(b,e) in zip(c["mdot"],burns):
+            if b <= t < e:
+                mdot = m
+                break
+        return(f,mdot)
+
+    edges = sorted(set([0.0,t_end]+[e for w in irradiation+eclipse+burns for e in w if 0.0 < e < t_end]))
+    segments = []
+    for t0,t1 in zip(edges[:-1],edges[1:]):
+        f,mdot = state(t0)
+        if segments and segments[-1][2:] == (f,mdot): #same inputs, extend the previous segment
+            segments[-1] = (segments[-1][0],t1,f,mdot)
+        else:
+            segments.append((t0,t1,f,mdot))
+    return(segments)
+
+
+def fun2(c):
+    ### Segments of fun1 as step ranges of the fixed time step "t_step"
+    t_step = c["t_step"]
+    n = int(c["n_t"]*3600/t_step)                                                  #[-], number of steps
+    steps = []
+    for t0,t1,f,mdot in fun1(c):
+        i0 = min(n,math.ceil(t0/t_step-1e-9))                                       #[-], first step with i*t_step >= t0
+        i1 = min(n,math.ceil(t1/t_step-1e-9))                                       #[-], first step with i*t_step >= t1
+        if i1 <= i0: #no steps in the segment
+            continue
+        if steps and steps[-1][2:] == (f,mdot):
+            steps[-1] = (steps[-1][0],i1,f,mdot)
+        else:
+            steps.append((i0,i1,f,mdot))
+    return(steps)
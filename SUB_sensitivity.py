@@ -0,0 +1,116 @@
+"""
+Sensitivities (Jacobian) of the PDT outputs to the numeric user inputs, by batched finite differences
+July 2020
+A. Takken
+"""
+
+### Usage
+# import SUB_sensitivity
+# s = SUB_sensitivity.fun1(config)                #all numeric inputs of config (as SUB_simulate.inputs())
+# s["J"][i,j]                                     #d(outputs[i])/d(inputs[j]) in the units of the inputs & outputs
+# s["elasticity"][i,j]                            #d ln(outputs[i]) / d ln(inputs[j]), to rank the design drivers
+# SUB_sensitivity.report(s)                       #inputs ranked per output
+#
+# The base design and all perturbed designs (two per input, central differences) run as one SUB_batch run, so the
+# perturbations share one vectorized pass. The step is "rel" times the value of the input (an absolute step "rel" for
+# inputs that are 0). Inputs that select a catalog entry or a model (RACtype, material, insulation, propellant,
+# channellayout), the schedule and the solver settings are left out. "mdot" scales all mass flow levels (derivative
+# per [kg/s] of the first level). Outputs are those of the summary: max TRAC, max Isp, max F & eta = P6/PinR.
+#
+# Geometry: the derivatives are partial, every input is perturbed with the others fixed. DmeanM moves the channels
+# within fixed walls (DinnerM & DouterM), pitch changes the spacing of the spiral at a fixed channel count, LcavC, LcavI
+# & LcavA are independent lengths. Coupled inputs that should move together are given by "coupled", e.g.
+# s = SUB_sensitivity.fun1(config,coupled={"DouterM":["DinnerM","DmeanM"],"LcavA":["LcavI","LcavC"]})
+# scales DinnerM & DmeanM by the same relative step as DouterM (derivative per [m] of DouterM). Perturbed designs that
+# break the geometry (see geometry()) raise a ValueError.
+
+import SUB_simulate
+import SUB_batch
+
+import numpy as np
+
+outputs = ["TRACmax","Ispmax","Fmax","eta"]
+excluded = ["RACtype","material","insulation","propellant","channellayout",
+            "n_t","n_i","n_p","PinR_i","eclipse","t_step","adaptive","Ttol","t_stepmax","nodes","segments","output","chunk","profile"]
+
+
+def numeric(config):
+    ### Names of the numeric inputs of a config
+    names = []
+    for name,value in config.items():
+        if name in excluded or isinstance(value,bool):
+            continue
+        if name == "mdot" and len(value):
+            names.append(name)
+        elif isinstance(value,(int,float)):
+            names.append(name)
+    return(names)
+
+
+def perturb(config,name,h,coupled=None):
+    ### Config with input "name" increased by h (mdot: all levels by the same factor), the inputs coupled[name] by the
+    ### same relative step
+    c = dict(config)
+    x = config["mdot"][0] if name == "mdot" else config[name]
+    if name == "mdot":
+        c["mdot"] = [m*(1+h/x) for m in config["mdot"]]
+    else:
+        c[name] = x+h
+    for other in (coupled or {}).get(name,[]):
+        c[other] = config[other]*(1+h/x) if x != 0 else config[other]+h
+    return(c)
+
+
+def geometry(config):
+    ### Geometric relations of the RAC that a config breaks (list of strings, empty for a valid geometry)
+    c = config
+    broken = []
+    for ok,text in [(c["Dap"] < c["DinnerM"],"Dap < DinnerM"),
+                    (c["DinnerM"] < c["DmeanM"] < c["DouterM"],"DinnerM < DmeanM < DouterM"),
+                    (c["LcavC"] <= c["LcavA"],"LcavC <= LcavA"),
+                    (c["LcavI"] < c["LcavA"],"LcavI < LcavA"),
+                    (c["channellayout"] != 1 or c["pitch"] >= c["nch"]*c["Dh"],"pitch >= nch*Dh (spiral)")]:
+        if not ok:
+            broken.append(text)
+    return(broken)
+
+
+def fun1(config,inputs=None,rel=1e-3,coupled=None):
+    ### Jacobian of the outputs to the inputs (default: all numeric inputs), central differences in one batch run
+    # coupled: inputs moved with an input by the same relative step, {input:[inputs]} (see the usage)
+    config = dict(SUB_simulate.inputs(),**config)
+    names = numeric(config) if inputs is None else list(inputs)
+    x = np.array([config[name][0] if name == "mdot" else config[name] for name in names],dtype=float)
+    h = np.where(x != 0,rel*np.abs(x),rel)                                      #[-], steps (units of the inputs)
+
+    configs = [config]
+    for name,hj in zip(names,h):
+        configs += [perturb(config,name,hj,coupled),perturb(config,name,-hj,coupled)]
+    for name,c in zip([None]+[name for name in names for sign in "+-"],configs):
+        broken = geometry(c)
+        if broken:
+            raise ValueError(("base design" if name is None else "perturbed "+name)+" breaks "+", ".join(broken)
+                             +" (move the inputs together with \"coupled\" or use a smaller \"rel\")")
+    with np.errstate(invalid='ignore'):
+        out = SUB_batch.simulate(configs)
+    Y = np.array([out[name] for name in outputs],dtype=float)                   #[-], (outputs,1+2*inputs)
+
+    y = Y[:,0]
+    J = (Y[:,1::2]-Y[:,2::2])/(2*h)                                             #[-], d(output)/d(input)
+    with np.errstate(divide='ignore',invalid='ignore'):
+        elasticity = J*x/y[:,None]
+    return({"inputs":names,"outputs":list(outputs),"coupled":dict(coupled or {}),"x":x,"y":y,"h":h,"J":J,"elasticity":elasticity,
+            "melted":out["melted"],"unchoked":out["unchoked"]})
+
+
+def report(s,top=8):
+    ### Prints the inputs with the largest elasticity per output
+    print("---------------")
+    for i,name in enumerate(s["outputs"]):
+        print("%s = %.4g, largest elasticities d ln(%s)/d ln(input):" % (name,s["y"][i],name))
+        e = np.nan_to_num(s["elasticity"][i])
+        for j in np.argsort(-np.abs(e))[:top]:
+            print("  %-10s %+9.4f   (d/dx = %+.4g per unit of %s)" % (s["inputs"][j],e[j],s["J"][i,j],s["inputs"][j]))
+    if np.any(s["melted"]) or np.any(s["unchoked"]):
+        print("Note: melted or not choked perturbed designs, derivatives across these limits are not smooth")
+    print("---------------")
@@ -0,0 +1,560 @@
+"""
+Simulation engine (setup, transient loop & summary)
+July 2020
+A. Takken
+"""
+
+### Usage
+# import SUB_simulate
+# config = SUB_simulate.inputs()          #default user inputs (same as MASTER_PDT)
+# config["PinR"] = 300.0                  #change any input
+# result = SUB_simulate.simulate(config)  #dict with NumPy arrays of the time series
+# SUB_simulate.report(config,result)      #prints the summary block of MASTER_PDT
+#
+# config["adaptive"] = True selects adaptive time stepping (Heun with an embedded Euler error estimate on TRAC):
+# steps of at most "t_stepmax" with a local error below "Ttol", landing exactly on the boundaries of the schedule.
+#
+# Multiple burns ("mdot" & "n_p"), irradiation windows ("n_i"), power levels ("PinR_i") and eclipses ("eclipse") are
+# turned into segments of constant inputs before the loop, see SUB_schedule.
+#
+# config["implicit"] = True selects backward Euler steps of "t_step" (stable at large steps, for a small heat capacity
+# or strong radiation losses): every step solves TRAC = TRAC0 + t_step*P7(TRAC)/cpM(TRAC)/MRAC. Not with "adaptive"
+# or "nodes" (ValueError).
+#
+# config["segments"] = 20 marches the propellant through the channels in 20 segments (local ReD, PrP, Nusselt number &
+# pressure drop) instead of the single channel balance of SUB_P6 & SUB_pLoss, see SUB_channel.
+#
+# config["nodes"] = 40 resolves the RAC in wall, propellant & insulation nodes along its length, see SUB_network (own
+# semi-implicit steps of "t_step", not with "adaptive").
+#
+# config["output"] = "run1.npy" streams the time series to a file in chunks (constant memory), see SUB_output.
+#
+# config["profile"] = True records the wall time per power term & the solver counters of every step, see SUB_profile
+# (fixed step loop only).
+#
+# result = SUB_simulate.steady_state(config) solves P7 = 0 for TRAC directly (irradiated, first mass flow level),
+# result["summary"] (or report(config,result)) gives the same summary block as the transient loop.
+
+import SUB_NISTandconstants
+import SUB_materialproperties
+import SUB_insulationproperties
+import SUB_RACdimensions
+import SUB_cache
+import SUB_properties
+import SUB_nozzle
+import SUB_pLoss
+import SUB_P123
+import SUB_P4
+import SUB_P6
+import SUB_rootfind
+import SUB_output
+import SUB_schedule
+import SUB_profile
+import SUB_network
+import SUB_channel
+
+import time
+import numpy as np
+
+
+def inputs():
+    ### Default user inputs, see MASTER_PDT for the explanation of every input
+    config = {
+        "PinR":         250.0,              #[W], incoming irradiance power
+        "Peff":         1.00,               #[-], power input efficiency
+        "n_t":          95.0/60,            #[h], hours of running
+        "n_i":          [0.0,95.0/60],      #[h], hours of irradiation [begin,end] (or a list of windows, see SUB_schedule)
+        "PinR_i":       None,               #[W], incoming irradiance power per irradiation window (None: "PinR")
+        "eclipse":      [],                 #[h], periods without irradiation [[begin,end],...]
+        "t_step":       1.00,               #[s], number of seconds per step
+        "Tamb":         298.15,             #[K], ambient temperature
+        "pamb":         1.01325e5,          #[Pa], ambient pressure
+        "RACtype":      1,                  #[-], RAC type. "0" for conical, "1" for cylindrical
+        "material":     0,                  #[-], RAC material
+        "TRAC":         298.15,             #[K], starting RAC temperature
+        "absoIC":       0.70,               #[-], absorbtivity of inner cavity black paint on inner area
+        "LcavC":        0.028,              #[m], channel length along RAC centerline
+        "LcavI":        0.034,              #[m], cavity inner length/height
+        "LcavA":        0.038,              #[m], overall length RAC
+        "DinnerM":      0.0118,             #[m], cavity base inner diameter
+        "DouterM":      0.019,              #[m], cavity base outer diameter
+        "DmeanM":       0.0124,             #[m], cavity channel diameter
+        "Dap":          0.004,              #[m], cavity aperture diameter
+        "phi":          0.0,                #[rad], cavity half angle (unused in case of cylinder)
+        "insulation":   0,                  #[-], insulation. "0" for none, "1" for Saffil M-FIL, "2" for MLI
+        "tI":           40.0e-3,            #[m], uniform thickness insulation
+        "propellant":   0,                  #[-], propellant. "0" N2, "1" water, "2" ammonia, "3" H2
+        "pIn":          8.16e5,             #[Pa], starting pressure propellant
+        "Tpi":          298.15,             #[K], starting temperature propellant
+        "mdot":         [300e-6],           #[kg/s], total mass flow
+        "n_p":          [[0,95]],           #[min], begin and end time of flow
+        "channellayout":1,                  #[-], channel layout. "0" for linear, "1" for spiral
+        "Dh":           0.0006,             #[m], cross-sectional diameter of channel
+        "nch":          12,                 #[-], number of channels
+        "pitch":        0.0016*12,          #[m], pitch between spiral cycles
+        "ksiF":         0.96,               #[-], nozzle quality/efficiency
+        "pe_min":       100,                #[Pa], minimum nozzle exit pressure
+        "ARACi":        None,               #[m2], override inner area (None: calculated)
+        "ARACo":        None,               #[m2], override outer area (None: calculated)
+        "MRAC":         None,               #[kg], override RAC mass (None: calculated)
+        "Aheat":        None,               #[m2], override heated wall area (None: calculated)
+        "adaptive":     False,              #[-], adaptive time stepping instead of the fixed "t_step"
+        "Ttol":         0.01,               #[K], adaptive: allowed local error in TRAC per step
+        "t_stepmax":    60.0,               #[s], adaptive: maximum step ("t_step" is the first step)
+        "implicit":     False,              #[-], backward Euler steps of "t_step" instead of explicit (Euler) steps
+        "nodes":        0,                  #[-], wall nodes along the RAC (SUB_network), 0: single RAC mass
+        "segments":     0,                  #[-], channel segments along Lch (SUB_channel), 0: single channel balance (SUB_P6)
+        "output":       None,               #[-], .npy file to stream the time series to (None: kept in memory)
+        "chunk":        10000,              #[-], output: number of steps per write
+        "profile":      False,              #[-], per-step wall time & solver counters in result["profile"] (SUB_profile)
+    }
+    return(config)
+
+
+def setup(config):
+    ### One-time calculations (constants, properties, geometry & view factors), independent of time
+    c = dict(inputs(),**config)
+    RACtype,DinnerM,DouterM,Dap,LcavI = c["RACtype"],c["DinnerM"],c["DouterM"],c["Dap"],c["LcavI"]
+    phi = c["phi"]
+    case = {}
+
+    # Constants, NIST data and material properties
+    g0,R_A,sigma,nameP,NISTP,limitsP,MMP = SUB_NISTandconstants.fun1(c["propellant"])             #Various constants and propellant properties
+    emM,absoM,T_maxM,NISTM,limitsM,MMM,rhoM,nameM,kM = SUB_materialproperties.fun1(c["material"]) #RAC material properties
+    if c["insulation"] > 0: #if insulation
+        kI,emI,T_maxI,nameI = SUB_insulationproperties.fun1(c["insulation"])                       #Insulation properties
+        emO = emI                                                                                   #[-], outer wall emissivity
+        DouterA = DouterM + c["tI"]*2                                                               #[m], overall outer diameter
+        LcavA = c["LcavA"] + c["tI"]*2                                                              #[m], overall length
+    else: #if no insulation
+        nameI = "No insulation"
+        kI = 0.0                                                                                    #[-]
+        emO = emM                                                                                   #[-], outer wall emissivity
+        DouterA = DouterM                                                                           #[m], overall outer diameter
+        LcavA = c["LcavA"]                                                                          #[m], overall length
+
+    # Dimensions RAC
+    ARACi,ARACo,MRAC = SUB_RACdimensions.fun1(RACtype,DinnerM,DouterM,DouterA,Dap,LcavA,rhoM)     #[-], calculated dimensions
+
+    if c["channellayout"] == 0:     #for linear channels
+        if RACtype == 0: #cone
+            Lch = c["LcavC"]/np.cos(phi)                                        #[m], linear channel length (cone)
+        elif RACtype == 1: #cylinder
+            Lch = c["LcavC"]                                                    #[m], linear channel length (cylinder)
+    elif c["channellayout"] == 1:   #for spiral channels
+        Lch = SUB_cache.spiral(RACtype,c["LcavC"],c["DmeanM"],c["pitch"])       #[m], spiral channel length (SUB_spiral)
+    Aheat = Lch*np.pi*c["Dh"]*c["nch"]          #[m2], heated wall area
+    Acs = 1/4*np.pi*c["Dh"]**2                  #[m2], cross-sectional channel area
+
+    if RACtype == 0: #cone
+        Dav = DinnerM/2                                             #[m], cavity average diameter
+    elif RACtype == 1: #cylinder
+        phi = 0.0                                                   #[rad], cavity half angle
+        Dav = DinnerM                                               #[m], cavity average diameter
+    LsI = ((4.79*np.cos(phi)**4.43 - 0.37*np.sin(phi)**0.719)*Dav                   #[m], characteristic length for inner convection
+          +(1.06*np.cos(phi)**3.24-0.0462*np.sin(phi)**0.286)*Dap
+          +(7.07*np.cos(phi)**5.31+0.221*np.sin(phi)**2.43)*LcavI)
+
+    # Radiation loss factors & power input
+    RlossA,RlossE = SUB_cache.viewfactors(RACtype,DinnerM,Dap,LcavI,c["absoIC"])         #Loss factors for inner wall radiation (cone or cylinder)
+    Pin = c["PinR"]*c["Peff"]*(1-RlossA)        #[W], absorbed incoming radiation
+
+    # Nozzle discharge coefficient relation (from [Johnson1998])
+    Cda = (0.937-0.968)/(0.016-0.008)           #[-], Cd relation slope
+    Cdb = 0.968-Cda*0.008                       #[-], Cd relation intercept
+
+    # Override options
+    ARACi = ARACi if c["ARACi"] is None else c["ARACi"]
+    ARACo = ARACo if c["ARACo"] is None else c["ARACo"]
+    MRAC = MRAC if c["MRAC"] is None else c["MRAC"]
+    Aheat = Aheat if c["Aheat"] is None else c["Aheat"]
+
+    case.update(g0=g0,R_A=R_A,sigma=sigma,nameP=nameP,NISTP=NISTP,limitsP=limitsP,MMP=MMP,
+                emM=emM,absoM=absoM,T_maxM=T_maxM,NISTM=NISTM,limitsM=limitsM,MMM=MMM,rhoM=rhoM,nameM=nameM,kM=kM,
+                kI=kI,emO=emO,nameI=nameI,DouterA=DouterA,LcavA=LcavA,
+                ARACi=ARACi,ARACo=ARACo,MRAC=MRAC,Lch=Lch,Aheat=Aheat,Acs=Acs,LsI=LsI,
+                RlossA=RlossA,RlossE=RlossE,Pin=Pin,Cda=Cda,Cdb=Cdb,
+                propP=SUB_properties.propellant(c["propellant"]),propM=SUB_properties.material(c["material"]))
+    return(case)
+
+
+def simulate(config,case=None):
+    ### Transient loop. "case" can be passed to reuse the one-time calculations of setup()
+    c = dict(inputs(),**config)
+    if case is None:
+        case = setup(c)
+    if c["profile"] and (c["adaptive"] or c["implicit"] or c["nodes"] > 0):
+        raise ValueError("profile is only available for the fixed step loop (not with adaptive, implicit or nodes)")
+    if c["implicit"] and (c["adaptive"] or c["nodes"] > 0):
+        raise ValueError("implicit cannot be combined with adaptive or nodes (the network steps are semi-implicit)")
+    if c["adaptive"] and c["nodes"] > 0:
+        raise ValueError("adaptive time stepping is not available for the network (nodes), see SUB_network")
+    if c["adaptive"]:
+        return(adaptive(c,case))
+    if c["implicit"]:
+        return(implicit(c,case))
+    if c["nodes"] > 0:
+        return(SUB_network.fun1(c,case))
+
+    # Inputs & one-time results as locals (the loop is the hot path)
+    t_step,n_t,Tamb,pamb = c["t_step"],c["n_t"],c["Tamb"],c["pamb"]
+    RACtype,insulation,propellant,channellayout = c["RACtype"],c["insulation"],c["propellant"],c["channellayout"]
+    DouterM,DmeanM,Dh,nch,pIn,Tpi = c["DouterM"],c["DmeanM"],c["Dh"],c["nch"],c["pIn"],c["Tpi"]
+    ksiF,pe_min = c["ksiF"],c["pe_min"]
+    g0,R_A,sigma,NISTP,limitsP,MMP = case["g0"],case["R_A"],case["sigma"],case["NISTP"],case["limitsP"],case["MMP"]
+    emM,T_maxM,NISTM,limitsM,MMM = case["emM"],case["T_maxM"],case["NISTM"],case["limitsM"],case["MMM"]
+    kI,emO,DouterA,LcavA = case["kI"],case["emO"],case["DouterA"],case["LcavA"]
+    ARACi,ARACo,MRAC,Lch,Aheat,Acs,LsI = case["ARACi"],case["ARACo"],case["MRAC"],case["Lch"],case["Aheat"],case["Acs"],case["LsI"]
+    RlossE,Pin,Cda,Cdb = case["RlossE"],case["Pin"],case["Cda"],case["Cdb"]
+    propM = case["propM"]
+    TRAC = c["TRAC"]
+
+    # Preallocated outputs (columns of SUB_output), all steps or chunks of "chunk" steps streamed to "output"
+    n = int(n_t*3600/t_step)                    #[-], number of steps
+    m = n if c["output"] is None else min(n,c["chunk"])
+    writer = None if c["output"] is None else SUB_output.Writer(c["output"])
+    M = np.zeros((m,len(SUB_output.columns)))
+    tM = M[:,0]                                 #[min], time
+    PM = M[:,1:9]                               #[W], Pin, P1-P7
+    TM = M[:,9:12]                              #[K], TRAC, Tinsu, Tpo
+    pcM,FM,IspM,vRM,ReDM,PrPM = M[:,12],M[:,13],M[:,14],M[:,15],M[:,16],M[:,17]
+    i0 = 0                                      #[-], first step in the chunk
+
+    melted = False
+    h123,h4 = 0.0,0.0
+    P6solver = channelsolver(c,case)            #[-], bulk temperature solver (warm started every step)
+    P123solver = SUB_P123.Solver()              #[-], outer wall solver (warm started every step)
+    segments = c["segments"]
+    profiler = SUB_profile.Profiler(m,P6solver,P123solver,c["output"]) if c["profile"] else None
+    clock = time.perf_counter if c["profile"] else float        #[s], clock of the profiler (float() = 0.0 without)
+    P6,F,Isp,Tpo,pc,v,vmax,ReD,PrP,ReT,Cd,At,Ae = 0.0,0.0,0.0,Tpi,pIn,0.0,1234.0,0.0,0.0,0.0,0.0,0.0,0.0
+    i = 0
+    for i0S,i1S,f,mdotS in SUB_schedule.fun2(c): #segments of constant irradiation & mass flow (SUB_schedule)
+
+        ### Inputs of the segment
+        PinL = f*Pin                                                                #[W], absorbed power
+        flow = mdotS > 0
+        if flow: #propellant flow
+            mdotch = mdotS/nch                                                      #[kg/s], mass flow per channel
+            v = mdotch/(pIn/(R_A/MMP*Tpi))/Acs                                      #[m/s], propellant end velocity
+            vmax = 175*(1/(pIn/(R_A/MMP*Tpi)))**0.43                                #[m/s], propellant maximum velocity
+        else: #no propellant flow
+            P6,F,Isp,Tpo,pc,v,vmax,ReD,PrP,ReT,Cd = 0.0,0.0,0.0,Tpi,pIn,0.0,1234.0,0.0,0.0,0.0,0.0
+
+        for i in range(i0S,i1S):
+
+            ### P1, P2 and P3. Outer (insulation) wall convection & radiation, combined in conduction (with insulation)
+            t0 = clock()
+            P1,P2,P3,Tinsu,h123 = P123solver.fun1(DouterA,DouterM,RACtype,ARACo,emO,TRAC,Tamb,pamb,g0,R_A,sigma,kI,insulation,LcavA)
+            t1 = clock()
+
+            ### P4. Inner wall convection
+            if pamb < 0.5: #if vacuum
+                P4,h4, = 0.0,0.0
+            else:
+                P4,h4 = SUB_P4.fun1(LsI,ARACi,TRAC,Tamb,pamb,g0,R_A)
+            t2 = clock()
+
+            ### P5. Inner wall radiation
+            P5 = emM*sigma*ARACi*(TRAC**4-Tamb**4)*RlossE
+            t3 = t4 = clock()
+
+            ### Propellant flow
+            if flow:
+
+                ### P6. Propellant convection (from RAC to propellant)
+                Tpo,P6,ReD,PrP,Tb = P6solver.fun1(Dh,DmeanM,Lch,Aheat,mdotS,mdotch,Tpi,TRAC,propellant,channellayout,NISTP,limitsP,MMP,Acs)
+                t4 = clock()
+
+                ### pc, F & Isp
+                if segments: #pressure after the segments (SUB_channel)
+                    pc = P6solver.pc
+                else:
+                    pc = SUB_pLoss.fun1(ReD,Dh,DmeanM,Lch,channellayout,R_A,Tb,mdotch,pIn,MMP)                                      #[Pa], pressure after pressure loss is applied
+                F,Isp,ReT,At,Ae,Cd = SUB_nozzle.fun1(pc,mdotS,R_A,MMP,Tpo,pamb,g0,propellant,NISTP,limitsP,pe_min,ksiF,Cda,Cdb)    #[-], nozzle outputs
+
+            ### P7. Heating of RAC
+            t5 = clock()
+            P7 = PinL - (P1+P2+P4+P5+P6)                    #[W], power to heat the RAC
+            cpM = propM.cp(TRAC)                             #[J/kg/K], specific heat coefficient at constant pressure (material)
+            TRAC = TRAC + P7*t_step/cpM/MRAC                #[K], resulting RAC temperature
+            t6 = clock()
+
+            ### Matrix saves
+            j = i-i0
+            tM[j] = i*t_step/60.0
+            PM[j] = Pin,P1,P2,P3,P4,P5,P6,P7
+            TM[j] = TRAC,Tinsu,Tpo
+            pcM[j],FM[j],IspM[j],vRM[j],ReDM[j],PrPM[j] = pc,F,Isp,v/vmax,ReD,PrP
+            if profiler is not None:
+                profiler.step(j,t0,t1,t2,t3,t4,t5,t6)
+            if j == m-1 and writer is not None: #chunk full
+                writer.write(M)
+                if profiler is not None:
+                    profiler.write(m)
+                i0 += m
+
+            ### Exceeding material melting temperature
+            if TRAC > T_maxM:
+                melted = True
+                break
+        if melted:
+            break
+    i = i+1 if melted else n
+
+    if writer is None:
+        M = M[:i]
+    else:
+        writer.write(M[:i-i0])
+        writer.close()
+        M = SUB_output.load(c["output"]).view("<f8").reshape(i,len(SUB_output.columns))
+    result = SUB_output.result(M)
+    result.update(ReT=ReT,Cd=Cd,At=At,Ae=Ae,h123=h123,h4=h4,melted=melted,P6solver=P6solver,P123solver=P123solver,case=case)
+    if profiler is not None:
+        result["profile"] = profiler.close(i-i0)
+    return(result)
+
+
+def channelsolver(c,case):
+    ### Solver of P6 for a time loop: the single channel balance (SUB_P6) or the channel segments (SUB_channel)
+    if c["segments"] > 0:
+        return(SUB_channel.Solver(c["segments"],c["pIn"],case["R_A"]))
+    return(SUB_P6.Solver())
+
+
+def powers(c,case,TRAC,PinL,mdot,P6solver,P123solver):
+    ### All power terms & propellant outputs at RAC temperature TRAC, absorbed power PinL [W] & mass flow mdot [kg/s]
+    # returns a dict, "dTdt" [K/s] is the resulting heating rate of the RAC
+    Tamb,pamb,pIn,Tpi = c["Tamb"],c["pamb"],c["pIn"],c["Tpi"]
+    R_A,MMP,Acs,Dh,nch = case["R_A"],case["MMP"],case["Acs"],c["Dh"],c["nch"]
+
+    P1,P2,P3,Tinsu,h123 = P123solver.fun1(case["DouterA"],c["DouterM"],c["RACtype"],case["ARACo"],case["emO"],TRAC,Tamb,pamb,
+                                        case["g0"],R_A,case["sigma"],case["kI"],c["insulation"],case["LcavA"])
+    if pamb < 0.5: #if vacuum
+        P4,h4 = 0.0,0.0
+    else:
+        P4,h4 = SUB_P4.fun1(case["LsI"],case["ARACi"],TRAC,Tamb,pamb,case["g0"],R_A)
+    P5 = case["emM"]*case["sigma"]*case["ARACi"]*(TRAC**4-Tamb**4)*case["RlossE"]
+
+    if mdot > 0: #propellant flow
+        mdotch = mdot/nch
+        Tpo,P6,ReD,PrP,Tb = P6solver.fun1(Dh,c["DmeanM"],case["Lch"],case["Aheat"],mdot,mdotch,Tpi,TRAC,c["propellant"],
+                                          c["channellayout"],case["NISTP"],case["limitsP"],MMP,Acs)
+        if c["segments"] > 0:
+            pc = P6solver.pc
+        else:
+            pc = SUB_pLoss.fun1(ReD,Dh,c["DmeanM"],case["Lch"],c["channellayout"],R_A,Tb,mdotch,pIn,MMP)
+        F,Isp,ReT,At,Ae,Cd = SUB_nozzle.fun1(pc,mdot,R_A,MMP,Tpo,pamb,case["g0"],c["propellant"],case["NISTP"],case["limitsP"],
+                                             c["pe_min"],c["ksiF"],case["Cda"],case["Cdb"])
+        rho = pIn/(R_A/MMP*Tpi)                         #[kg/m3], inflow density
+        vR = mdotch/rho/Acs/(175*(1/rho)**0.43)         #[-], end velocity over maximum velocity
+    else: #no propellant flow
+        P6,F,Isp,Tpo,pc,vR,ReD,PrP,ReT,Cd,At,Ae = 0.0,0.0,0.0,Tpi,pIn,0.0,0.0,0.0,0.0,0.0,0.0,0.0
+
+    P7 = PinL - (P1+P2+P4+P5+P6)                        #[W], power to heat the RAC
+    dTdt = P7/case["propM"].cp(TRAC)/case["MRAC"]       #[K/s], heating rate of the RAC
+    return({"P":(case["Pin"],P1,P2,P3,P4,P5,P6,P7),"Tinsu":Tinsu,"Tpo":Tpo,"pc":pc,"F":F,"Isp":Isp,"vR":vR,"ReD":ReD,"PrP":PrP,
+            "ReT":ReT,"Cd":Cd,"At":At,"Ae":Ae,"h123":h123,"h4":h4,"dTdt":dTdt})
+
+
+def adaptive(c,case):
+    ### Transient loop with adaptive time steps (Heun, error estimated by the difference with Euler)
+    # Same outputs as simulate(), rows are the accepted steps: powers at the start of the step, TRAC at its end
+    # (as in the fixed loop). Extra outputs: "steps" (accepted) and "rejected".
+    Ttol,hmax,t_end = c["Ttol"],c["t_stepmax"],c["n_t"]*3600
+    TRAC,T_maxM,Pin = c["TRAC"],case["T_maxM"],case["Pin"]
+    rows = {key:[] for key in ["t","P","T","pc","F","Isp","vR","ReD","PrP"]}
+
+    P6solver,P123solver = channelsolver(c,case),SUB_P123.Solver()
+    t,h = 0.0,min(c["t_step"],hmax)
+    melted,rejected = False,0
+    At,Ae = 0.0,0.0
+    for t0,t_next,f,mdot in SUB_schedule.fun1(c): #segments of constant irradiation & mass flow (SUB_schedule)
+        PinL = f*Pin                                    #[W], absorbed power
+        while t < t_next:
+            out = powers(c,case,TRAC,PinL,mdot,P6solver,P123solver)
+            k1 = out["dTdt"]
+
+            # Step, stretched up to 10% to land on the end of the segment
+            while True:
+                if t+1.1*h >= t_next:
+                    h = t_next-t
+                k2 = powers(c,case,TRAC+h*k1,PinL,mdot,P6solver,P123solver)["dTdt"]
+                err = abs(k2-k1)*h/2                    #[K], local error estimate
+                if err <= Ttol or h <= 1e-3:
+                    break
+                rejected += 1
+                h = h*max(0.2,0.9*np.sqrt(Ttol/err))
+            TRAC = TRAC + h*(k1+k2)/2                   #[K], resulting RAC temperature
+
+            ### Saves
+            rows["t"].append(t/60.0)
+            rows["P"].append(out["P"])
+            rows["T"].append((TRAC,out["Tinsu"],out["Tpo"]))
+            for key in ["pc","F","Isp","vR","ReD","PrP"]:
+                rows[key].append(out[key])
+            if mdot > 0:
+                At,Ae = out["At"],out["Ae"]
+
+            t = t_next if t_next-(t+h) < 1e-9*t_end else t+h
+            h = min(hmax,4*h if err == 0 else h*min(4.0,0.9*np.sqrt(Ttol/err)))
+
+            ### Exceeding material melting temperature
+            if TRAC > T_maxM:
+                melted = True
+                break
+        if melted:
+            break
+
+    result = {key:np.array(val) for key,val in rows.items()}
+    if c["output"] is not None: #few steps, written at once
+        with SUB_output.Writer(c["output"]) as writer:
+            writer.write(np.column_stack([result[key] for key in ["t","P","T","pc","F","Isp","vR","ReD","PrP"]]))
+    result.update(ReT=out["ReT"],Cd=out["Cd"],At=At,Ae=Ae,h123=out["h123"],h4=out["h4"],
+                  melted=melted,P6solver=P6solver,P123solver=P123solver,case=case,steps=len(rows["t"]),rejected=rejected)
+    return(result)
+
+
+def implicit(c,case):
+    ### Transient loop with backward Euler steps of "t_step": TRAC = TRAC0 + t_step*dTdt(TRAC) is solved every step
+    # The explicit (Euler) step brackets the solution when the heating rate drops with the temperature (the losses
+    # rise), so the bracketed root find (SUB_rootfind) starts from [TRAC0, TRAC0 + t_step*dTdt(TRAC0)].
+    # Same outputs as simulate(), rows hold the powers at the end of the step (the solution). Extra outputs: "steps"
+    # and "nfev" (evaluations of the power terms).
+    t_step,T_maxM,Pin = c["t_step"],case["T_maxM"],case["Pin"]
+    TRAC = c["TRAC"]
+    rows = {key:[] for key in ["t","P","T","pc","F","Isp","vR","ReD","PrP"]}
+
+    P6solver,P123solver = channelsolver(c,case),SUB_P123.Solver()
+    melted,nfev = False,0
+    At,Ae = 0.0,0.0
+    for i0S,i1S,f,mdot in SUB_schedule.fun2(c): #segments of constant irradiation & mass flow (SUB_schedule)
+        PinL = f*Pin                                    #[W], absorbed power
+
+        def RESULTANT(T):
+            return(T-TRAC0-t_step*powers(c,case,T,PinL,mdot,P6solver,P123solver)["dTdt"])
+
+        for i in range(i0S,i1S):
+            TRAC0 = TRAC
+            k1 = powers(c,case,TRAC0,PinL,mdot,P6solver,P123solver)["dTdt"]
+            T1 = TRAC0+t_step*k1                        #[K], explicit (Euler) step
+            if k1 != 0:
+                Tcap = 2*T_maxM                         #[K], upper limit of the bracket (melted far below)
+                a,b = max(1.0,min(TRAC0,T1)),min(Tcap,max(TRAC0,T1))
+                fa,fb = RESULTANT(a),RESULTANT(b)
+                d = max(b-a,1e-3)                       #[K], widening of the bracket
+                while fa*fb > 0 and (a > 1.0 or b < Tcap): #no sign change: widen the bracket
+                    a,b = max(1.0,a-d),min(Tcap,b+d)
+                    fa,fb = RESULTANT(a),RESULTANT(b)
+                    nfev += 2
+                    d *= 2
+                if fa*fb > 0: #no solution below Tcap: still heating at Tcap
+                    TRAC,n = b,0
+                else:
+                    TRAC,it,n,ok = SUB_rootfind.fun2(RESULTANT,a,b,fa,fb,xtol=1e-6,ftol=1e-9) #[K], resulting RAC temperature
+                nfev += n+4
+            else:
+                nfev += 2
+            out = powers(c,case,TRAC,PinL,mdot,P6solver,P123solver)
+
+            ### Saves
+            rows["t"].append(i*t_step/60.0)
+            rows["P"].append(out["P"])
+            rows["T"].append((TRAC,out["Tinsu"],out["Tpo"]))
+            for key in ["pc","F","Isp","vR","ReD","PrP"]:
+                rows[key].append(out[key])
+            if mdot > 0:
+                At,Ae = out["At"],out["Ae"]
+
+            ### Exceeding material melting temperature
+            if TRAC > T_maxM:
+                melted = True
+                break
+        if melted:
+            break
+
+    result = {key:np.array(val) for key,val in rows.items()}
+    if c["output"] is not None:
+        with SUB_output.Writer(c["output"]) as writer:
+            writer.write(np.column_stack([result[key] for key in ["t","P","T","pc","F","Isp","vR","ReD","PrP"]]))
+    result.update(ReT=out["ReT"],Cd=out["Cd"],At=At,Ae=Ae,h123=out["h123"],h4=out["h4"],
+                  melted=melted,P6solver=P6solver,P123solver=P123solver,case=case,steps=len(rows["t"]),nfev=nfev)
+    return(result)
+
+
+def steady_state(config,case=None,level=0):
+    ### Equilibrium of the RAC (P7 = 0) with irradiation and the mass flow mdot[level], solved for TRAC directly
+    # returns a result with one row (same keys as simulate()) and its summary in "summary"
+    c = dict(inputs(),**config)
+    if case is None:
+        case = setup(c)
+    mdot = c["mdot"][level] if len(c["mdot"]) else 0.0
+    P6solver,P123solver = channelsolver(c,case),SUB_P123.Solver()
+
+    def P7(TRAC):
+        return powers(c,case,TRAC,case["Pin"],mdot,P6solver,P123solver)["P"][7]
+
+    # Bracket: no losses below the ambient & inflow temperature, melting temperature as the upper limit
+    a,b = min(c["Tamb"],c["Tpi"])-1.0,case["T_maxM"]
+    fa,fb = P7(a),P7(b)
+    melted = fb > 0
+    if melted: #no equilibrium below the melting temperature
+        TRAC,converged = b,False
+    else:
+        TRAC,it,nfev,converged = SUB_rootfind.fun2(P7,a,b,fa=fa,fb=fb,xtol=1e-6,ftol=1e-9*case["Pin"])
+    out = powers(c,case,TRAC,case["Pin"],mdot,P6solver,P123solver)
+
+    result = {"t":np.array([np.inf]),"P":np.array([out["P"]]),"T":np.array([[TRAC,out["Tinsu"],out["Tpo"]]]),
+              "ReT":out["ReT"],"Cd":out["Cd"],"At":out["At"],"Ae":out["Ae"],"h123":out["h123"],"h4":out["h4"],
+              "melted":melted,"converged":converged,"P6solver":P6solver,"P123solver":P123solver,"case":case}
+    for key in ["pc","F","Isp","vR","ReD","PrP"]:
+        result[key] = np.array([out[key]])
+    result["summary"] = summary(c,result)
+    return(result)
+
+
+def summary(config,result):
+    ### Summary block of MASTER_PDT as a dict
+    c = dict(inputs(),**config)
+    P,T,Isp = result["P"],result["T"],result["Isp"]
+    s = {"TRACmax":float(T[:,0].max()) if len(T) else c["TRAC"],
+         "flow":bool(len(Isp)) and Isp.max() > 0.0}
+    if s["flow"]:
+        s.update(Tpomax=float(T[:,2].max()),
+                 eta=float(P[-1,6]/c["PinR"]),
+                 Ispmax=float(Isp.max()),
+                 Fmax=float(result["F"].max()),
+                 pLossmax=float(c["pIn"]-result["pc"].min()),
+                 vRmax=float(result["vR"].max()),
+                 PrPmin=float(result["PrP"].min()),PrPmax=float(result["PrP"].max()),
+                 ReDmin=float(result["ReD"].min()),ReDmax=float(result["ReD"].max()),
+                 ReT=float(result["ReT"]),Cd=float(result["Cd"]),
+                 Dt=float(np.sqrt(result["At"]*1e6*4/np.pi)),De=float(np.sqrt(result["Ae"]*1e6*4/np.pi)))
+    return(s)
+
+
+def report(config,result):
+    ### Prints the summary block of MASTER_PDT
+    c = dict(inputs(),**config)
+    s = summary(c,result)
+    if result["melted"]:
+        print("RAC temperature exceeds material melting point!")
+    print("---------------")
+    print("RAC type:",c["RACtype"])
+    print("RAC material:",c["material"])
+    print("Insulation:",c["insulation"])
+    print("Propellant:",c["propellant"])
+    print("Power input:",c["PinR"],"[W] at an efficiency of",c["Peff"]*100.0,"[%]")
+    print("Max RAC temperature:","%.1f" % s["TRACmax"],"[K]")
+    if s["flow"]:
+        print("Max prop temperature:","%.1f" % s["Tpomax"],"[K]")
+        print("Thermal efficiency:","%.1f" % (s["eta"]*100.0),"[%]")
+        print("Max Isp:","%.1f" % s["Ispmax"],"[s]")
+        print("Max thrust:","%.3f" % s["Fmax"],"[N]")
+        print("Max pressure loss:","%.1f" % s["pLossmax"],"[Pa]")
+        print("Max v/vmax:","%.3f" % s["vRmax"],"[-]")
+        print("Min PrP:","%.3f" % s["PrPmin"],"[-], max PrP:","%.3f" % s["PrPmax"],"[-]")
+        print("Min channel ReD:","%.1f" % s["ReDmin"],"[-], max channel ReD:","%.1f" % s["ReDmax"],"[-]")
+        print("Nozzle ReT:","%.1f" % s["ReT"],"[-], giving a discharge coefficient of:","%.3f" % s["Cd"],"[-]")
+        print("Throat diameter:","%.3f" % s["Dt"],"[mm], Exit diameter:","%.3f" % s["De"],"[mm]")
+    print("---------------")
@@ -5,37 +5,50 @@ Source: https://mathworld.wolfram.com/ConicalSpiral.html
 """
 
 import numpy as np
-#import matplotlib.pyplot as plt
 
-def fun1(RACtype,Lcav,D,pitch):
+def fun1(RACtype,Lcav,D,pitch,n=0):
+
+    ### Channel length of a spiral, conical or cylindrical
+    # n [-]: 0 for the exact (closed-form) arc length of the conical spiral, otherwise the length of a polyline
+    # through n points (z = 0 ... Lcav*(n-1)/n, the original discretisation had n = 10000)
 
     if RACtype == 0: #conical
         hypot = np.sqrt(Lcav**2+(1/2*D)**2)         #[m], side length of cone
         N = hypot/pitch                             #[-], number of revolutions
         a = N*2.0*np.pi/Lcav                        #[1/m], angular frequency
-        
-        X,Y,Z = [],[],[] 
-        arcL = 0                         
-        n = 10000                                   #[-], number of cycles
-        
-        for i in range(0,n):
-            z = Lcav*i/n
+
+        if n == 0:
+            # Radius r = s/Lcav*D/2 with s = Lcav-z, so ds = sqrt(A+B*s^2) with:
+            A = 1+(D/2/Lcav)**2                     #[-]
+            B = (a*D/2/Lcav)**2                     #[1/m2]
+            arcL = (Lcav/2*np.sqrt(A+B*Lcav**2)+A/(2*np.sqrt(B))*np.arcsinh(Lcav*np.sqrt(B/A)))
+        else:
+            z = Lcav*np.arange(n)/n
             x = (Lcav-z)/Lcav*D/2*np.cos(a*z)
             y = (Lcav-z)/Lcav*D/2*np.sin(a*z)
-            
-            if i >= 1:   
-                arcL += np.sqrt((x-X[-1])**2+(y-Y[-1])**2+(z-Z[-1])**2)
-            
-            X.append(x)
-            Y.append(y)
-            Z.append(z)
-    
-        #plt.figure(1)
-        #ax = plt.axes(projection='3d')
-        #ax.plot3D(X,Y,Z, 'gray')
-    
+            arcL = np.sum(np.sqrt(np.diff(x)**2+np.diff(y)**2+np.diff(z)**2))
+
     if RACtype == 1: #cylindrical
         N = Lcav/pitch
         arcL = np.sqrt(np.pi**2*D**2+(Lcav/N)**2)*N
-    
+
     return(arcL)
+
+
+def fun2(RACtype,Lcav,D,pitch):
+
+    ### Vectorized (exact) version of fun1 for arrays of designs, all inputs are broadcast
+    RACtype,Lcav,D,pitch = np.broadcast_arrays(RACtype,Lcav,D,pitch)
+    Lcav,D,pitch = (np.asarray(x,dtype=float) for x in (Lcav,D,pitch))
+
+    # Conical
+    a = np.sqrt(Lcav**2+(1/2*D)**2)/pitch*2.0*np.pi/Lcav                             #[1/m], angular frequency
+    A = 1+(D/2/Lcav)**2
+    B = (a*D/2/Lcav)**2
+    cone = Lcav/2*np.sqrt(A+B*Lcav**2)+A/(2*np.sqrt(B))*np.arcsinh(Lcav*np.sqrt(B/A))
+
+    # Cylindrical
+    N = Lcav/pitch
+    cylinder = np.sqrt(np.pi**2*D**2+(Lcav/N)**2)*N
+
+    return(np.where(RACtype == 0,cone,cylinder))
@@ -0,0 +1,169 @@
+"""
+Surrogate model (polynomial response surface) of the steady state RAC performance
+July 2020
+A. Takken
+"""
+
+### Usage
+# import SUB_surrogate
+# box = {"PinR":(150.0,300.0),"mdot":(100e-6,400e-6),"Dh":(0.0004,0.0008),"nch":(8,16),"DmeanM":(0.0110,0.0140)}
+# model = SUB_surrogate.fit(box,levels={"material":[0,1]})    #samples SUB_simulate.steady_state & fits the surrogate
+# print(model.error)                                          #validation error per output (rms & max, relative)
+# out = model.predict(PinR=P,mdot=m,Dh=D,nch=12,DmeanM=0.0124,material=0)     #arrays (or floats), vectorized
+# out["Isp"], out["F"], out["TRAC"]
+# model.save("surrogate1.npz"), model = SUB_surrogate.load("surrogate1.npz")
+#
+# Continuous inputs ("box", lower & upper bound) are sampled by a Latin hypercube, discrete inputs ("levels", e.g.
+# material) get a surrogate per combination of levels. "base" holds the other inputs (SUB_simulate.inputs() by default),
+# "mdot" is the (single) mass flow level. Every sample is a steady state (P7 = 0, see SUB_simulate.steady_state),
+# fitted by least squares with a polynomial of total degree "degree" in the inputs scaled to [-1,1]. Samples that melt
+# (no equilibrium below the melting temperature) are left out of the fit and counted in "melted", samples without
+# propellant flow (no Isp & Tpo, e.g. mdot = 0) are left out and counted in "noflow".
+# The validation error is measured on separate samples ("nvalid") that are not used in the fit.
+
+import SUB_simulate
+
+import itertools
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+outputs = ["Isp","F","TRAC","Tpo","eta"]
+
+
+def exponents(d,degree):
+    ### Exponents (terms,d) of all monomials of d variables up to total degree "degree"
+    E = [e for e in itertools.product(range(degree+1),repeat=d) if sum(e) <= degree]
+    return(np.array(sorted(E,key=lambda e:(sum(e),[-x for x in e])),dtype=int))
+
+
+def features(Z,E):
+    ### Monomials of the scaled inputs Z (N,d) for the exponents E, (N,terms)
+    powers = [np.ones_like(Z)]
+    for k in range(E.max()):
+        powers.append(powers[-1]*Z)
+    A = np.empty((len(Z),len(E)))
+    for j,e in enumerate(E):
+        a = np.ones(len(Z))
+        for v,k in enumerate(e):
+            if k:
+                a = a*powers[k][:,v]
+        A[:,j] = a
+    return(A)
+
+
+def sample(config):
+    ### Steady state outputs of one design (in a worker process) & its state: 0 (valid), 1 (melted) or 2 (no flow),
+    ### outputs NaN if not valid
+    with np.errstate(invalid='ignore'):
+        result = SUB_simulate.steady_state(config)
+    if result["melted"]:
+        return([np.nan]*len(outputs)+[1])
+    s = result["summary"]
+    if not s["flow"]:
+        return([np.nan]*len(outputs)+[2])
+    return([s["Ispmax"],s["Fmax"],s["TRACmax"],s["Tpomax"],s["eta"],0])
+
+
+def lhs(n,d,rng):
+    ### Latin hypercube of n points in [0,1]^d
+    return((np.argsort(rng.random((n,d)),axis=0)+rng.random((n,d)))/n)
+
+
+class Surrogate:
+
+    def __init__(self,names,lower,upper,levels,E,coef,error=None,melted=None,noflow=None):
+        self.names = list(names)                #[-], continuous inputs
+        self.lower = np.array(lower,dtype=float)
+        self.upper = np.array(upper,dtype=float)
+        self.levels = dict(levels)              #[-], discrete inputs and their values
+        self.E = np.array(E,dtype=int)          #[-], exponents of the terms
+        self.coef = coef                        #[-], {combination of levels: coefficients (terms,outputs)}
+        self.error = error or {}                #[-], validation error per output {"rms":..,"max":..}
+        self.melted = melted or {}              #[-], melted samples per combination of levels
+        self.noflow = noflow or {}              #[-], samples without propellant flow per combination of levels
+
+    def predict(self,**inputs):
+        ### Outputs at the given inputs (floats or arrays, broadcast), dict of arrays with the names of "outputs"
+        arrs = np.broadcast_arrays(*[np.asarray(inputs[name],dtype=float) for name in self.names+list(self.levels)])
+        shape = arrs[0].shape
+        X = np.stack([a.ravel() for a in arrs[:len(self.names)]],axis=1)
+        Z = 2*(X-self.lower)/(self.upper-self.lower)-1                         #[-], scaled inputs
+        L = np.stack([a.ravel() for a in arrs[len(self.names):]],axis=1) if self.levels else None
+        Y = np.full((len(Z),len(outputs)),np.nan)
+        for combination,coef in self.coef.items():
+            s = np.all(L == np.array(combination,dtype=float),axis=1) if self.levels else slice(None)
+            Y[s] = features(Z[s],self.E) @ coef
+        return({name:Y[:,j].reshape(shape) for j,name in enumerate(outputs)})
+
+    def save(self,path):
+        keys = list(self.coef)
+        np.savez(path,names=self.names,lower=self.lower,upper=self.upper,levelnames=list(self.levels),
+                 levelvalues=np.array([self.levels[name] for name in self.levels],dtype=object),
+                 E=self.E,keys=np.array(keys,dtype=float).reshape(len(keys),-1),coef=np.array([self.coef[k] for k in keys]),
+                 error=np.array([[self.error[name]["rms"],self.error[name]["max"]] for name in outputs]),
+                 melted=np.array([self.melted.get(k,0) for k in keys]),noflow=np.array([self.noflow.get(k,0) for k in keys]))
+
+
+def load(path):
+    ### Surrogate saved by Surrogate.save
+    d = np.load(path,allow_pickle=True)
+    keys = [tuple(k) for k in d["keys"].tolist()]
+    levels = {name:list(values) for name,values in zip(d["levelnames"].tolist(),d["levelvalues"])}
+    error = {name:{"rms":e[0],"max":e[1]} for name,e in zip(outputs,d["error"])}
+    noflow = d["noflow"].tolist() if "noflow" in d.files else [0]*len(keys)
+    return(Surrogate(d["names"].tolist(),d["lower"],d["upper"],levels,d["E"],dict(zip(keys,d["coef"])),
+                     error,dict(zip(keys,d["melted"].tolist())),dict(zip(keys,noflow))))
+
+
+def fit(box,levels=None,base=None,samples=400,nvalid=100,degree=3,seed=0,workers=1):
+    ### Samples the steady state over the box (for every combination of levels) and fits the surrogate
+    # workers: number of processes for the sampling (None: all cores)
+    levels = levels or {}
+    base = dict(SUB_simulate.inputs(),**(base or {}))
+    names = list(box)
+    lower,upper = np.array([box[name][0] for name in names],dtype=float),np.array([box[name][1] for name in names],dtype=float)
+    E = exponents(len(names),degree)
+    if samples < len(E):
+        raise ValueError("at least %d samples are needed for degree %d" % (len(E),degree))
+    rng = np.random.default_rng(seed)
+
+    combinations = list(itertools.product(*[levels[name] for name in levels]))
+    X = lower+lhs(samples+nvalid,len(names),rng)*(upper-lower)
+    configs = []
+    for combination in combinations:
+        for x in X:
+            config = dict(base,**dict(zip(levels,combination)),**dict(zip(names,x.tolist())))
+            if "mdot" in names:
+                config["mdot"] = [config["mdot"]]
+            if "nch" in names:
+                config["nch"] = int(round(config["nch"]))
+            configs.append(config)
+    if workers == 1:
+        Y = [sample(config) for config in configs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            Y = list(pool.map(sample,configs,chunksize=16))
+    Y = np.array(Y,dtype=float).reshape(len(combinations),samples+nvalid,len(outputs)+1)
+    Y,state = Y[:,:,:-1],Y[:,:,-1]                                              #[-], outputs & state (see sample)
+    if "nch" in names:
+        X[:,names.index("nch")] = np.round(X[:,names.index("nch")])
+
+    Z = 2*(X-lower)/(upper-lower)-1                                             #[-], scaled inputs
+    A = features(Z,E)
+    coef,melted,noflow,residuals,scale = {},{},{},[],[]
+    for k,combination in enumerate(combinations):
+        ok = (state[k] == 0) & ~np.any(np.isnan(Y[k]),axis=1)
+        fitted,valid = ok[:samples],ok[samples:]
+        melted[combination] = int(np.sum(state[k] == 1))
+        noflow[combination] = int(np.sum(state[k] == 2))
+        if np.sum(fitted) < len(E):
+            raise ValueError("too few samples with flow and without melting for "+str(dict(zip(levels,combination))))
+        coef[combination] = np.linalg.lstsq(A[:samples][fitted],Y[k,:samples][fitted],rcond=None)[0]
+        residuals.append(A[samples:][valid] @ coef[combination]-Y[k,samples:][valid])
+        scale.append(Y[k,samples:][valid])
+    residuals,scale = np.concatenate(residuals),np.abs(np.concatenate(scale))
+    with np.errstate(invalid='ignore',divide='ignore'):
+        relative = np.abs(residuals)/np.maximum(scale,1e-12*np.max(scale,axis=0))
+    error = {name:{"rms":float(np.sqrt(np.mean(relative[:,j]**2))),"max":float(np.max(relative[:,j]))}
+             for j,name in enumerate(outputs)}
+    return(Surrogate(names,lower,upper,levels,E,coef,error,melted,noflow))
@@ -0,0 +1,159 @@
+"""
+Parameter sweeps over a process pool, with a resumable result store
+July 2020
+A. Takken
+"""
+
+### Usage (the "if" is needed for the process pool on Windows)
+# import SUB_sweep
+# if __name__ == "__main__":
+#     cases = SUB_sweep.grid(RACtype=[0,1],material=[0,1],insulation=[0,1],propellant=[0,3],mdot=[[200e-6],[300e-6]],PinR=[200.0,250.0])
+#     SUB_sweep.run(cases,"sweep1")           #all cores, cases already in "sweep1" are skipped (resume)
+#     table = SUB_sweep.load("sweep1")        #dict of columns (summary of every case)
+#     series = SUB_sweep.series("sweep1",table["key"][0])
+#
+# Store (a folder), columnar: "summary/<name>.npy" per column (SUB_output.Writer, one row per finished case, appended
+# on completion) for the key, the summary and the inputs of the grid, stored as the index of their value in
+# "summary/levels.json" (the values of every input), and per case "series/<key>.npz" with the time series as columns
+# (t, P, T, pc, F, Isp, vR, ReD, PrP). A case is finished once its key is in "summary/key.npy" (written last). The key is a hash of the inputs given for the case (base & grid
+# values), not of the defaults of SUB_simulate.inputs(): a store stays valid when a default or a new input is added.
+# "output" & "profile" are rejected (ValueError): the store keeps the series of every case.
+
+import SUB_simulate
+import SUB_output
+
+import os
+import json
+import hashlib
+import itertools
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+columns = ["TRACmax","Ispmax","Fmax","eta","Tpomax","pLossmax","vRmax","ReDmin","ReDmax","Dt","De","melted","steps"]
+
+
+def grid(**values):
+    ### All combinations of the given inputs, e.g. grid(PinR=[200.0,250.0],mdot=[[200e-6],[300e-6]])
+    names = list(values)
+    return([dict(zip(names,combination)) for combination in itertools.product(*[values[name] for name in names])])
+
+
+def key(config):
+    ### Identifier of a case, from the inputs given by the user (base & grid values, without the defaults)
+    text = json.dumps(config,sort_keys=True,default=float)
+    return(hashlib.sha1(text.encode()).hexdigest()[:16])
+
+
+def case(config):
+    ### Runs one case (in a worker process): time series & summary
+    result = SUB_simulate.simulate(config)
+    s = SUB_simulate.summary(config,result)
+    row = {name:s.get(name,np.nan) for name in columns}
+    row["melted"],row["steps"] = result["melted"],len(result["t"])
+    series = {name:result[name] for name in ["t","P","T","pc","F","Isp","vR","ReD","PrP"]}
+    return(row,series)
+
+
+def done(path):
+    ### Keys of the finished cases in the store
+    name = os.path.join(path,"summary","key.npy")
+    if not os.path.exists(name):
+        return(set())
+    return(set(k.decode() for k in np.load(name)["key"]))
+
+
+def levels(path):
+    ### Values of the inputs of the grid in the store ({} for a new store)
+    name = os.path.join(path,"summary","levels.json")
+    if not os.path.exists(name):
+        return({})
+    with open(name) as f:
+        return(json.load(f))
+
+
+def run(cases,path,base=None,workers=None,keep=True):
+    ### Runs all cases that are not yet in the store "path" over a process pool (workers: None for all cores)
+    # cases: list of dicts with inputs (see grid), base: inputs shared by all cases (default SUB_simulate.inputs())
+    # keep: False to store the summary only. Returns the number of cases run.
+    given = base or {}                      #inputs given by the user (key)
+    for c in [given]+list(cases):
+        if c.get("output") is not None or c.get("profile"):
+            raise ValueError("output & profile are not available in a sweep (the store keeps the series)")
+    base = dict(SUB_simulate.inputs(),**given)
+    names = sorted(set(name for c in cases for name in c))
+    os.makedirs(os.path.join(path,"series"),exist_ok=True)
+    os.makedirs(os.path.join(path,"summary"),exist_ok=True)
+    finished = done(path)
+    todo = {}
+    for c in cases:
+        config = dict(base,**c)
+        k = key(dict(given,**c))
+        if k not in finished and k not in todo:
+            todo[k] = (c,config)
+    if not todo:
+        return(0)
+
+    values = levels(path)
+    if values: #inputs as in the existing store
+        if not set(names) <= set(values):
+            raise ValueError("inputs "+str(sorted(set(names)-set(values)))+" are not in the store "+path)
+        names = sorted(values)
+    else:
+        values = {name:[] for name in names}
+    n = len(finished)                       #[-], rows of the finished cases (columns written before the key are cut)
+
+    def writer(name,fmt="<f8"):
+        file = os.path.join(path,"summary",name+".npy")
+        return(SUB_output.Writer(file,[name],fmt,n if os.path.exists(file) else None))
+
+    writers = {name:writer(name) for name in names+columns}
+    writers["key"] = writer("key","S16")
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            jobs = {pool.submit(case,config):k for k,(c,config) in todo.items()}
+            for job in as_completed(jobs):
+                k = jobs[job]
+                row,series = job.result()
+                if keep:
+                    np.savez(os.path.join(path,"series",k+".npz"),**series)
+                level = []                  #[-], index of the value of every input
+                for name in names:
+                    value = json.loads(json.dumps(todo[k][1].get(name),default=float))
+                    if value not in values[name]:
+                        values[name].append(value)
+                        with open(os.path.join(path,"summary","levels.json.tmp"),"w") as f:
+                            json.dump(values,f)
+                        os.replace(os.path.join(path,"summary","levels.json.tmp"),os.path.join(path,"summary","levels.json"))
+                    level.append(values[name].index(value))
+                for name,x in zip(names+columns,level+[float(row[name]) for name in columns]):
+                    writers[name].write([x])
+                    writers[name].flush()
+                writers["key"].write([k])
+                writers["key"].flush()      #the key marks the case as finished
+    finally:
+        for writer in writers.values():
+            writer.close()
+    return(len(todo))
+
+
+def load(path):
+    ### Summary of all finished cases as a dict of columns (inputs of the grid are decoded, summary as arrays)
+    values = levels(path)
+    if not values:
+        return({})
+    summary = os.path.join(path,"summary")
+    keys = np.load(os.path.join(summary,"key.npy"))["key"]
+    n = len(keys)
+    table = {"key":[k.decode() for k in keys]}
+    for name in sorted(values):
+        table[name] = [values[name][int(i)] for i in np.load(os.path.join(summary,name+".npy"))[name][:n]]
+    for name in columns:
+        table[name] = np.load(os.path.join(summary,name+".npy"))[name][:n]
+    table["melted"] = table["melted"] > 0
+    return(table)
+
+
+def series(path,k):
+    ### Time series of case "k" (key in the summary) as a dict of arrays
+    with np.load(os.path.join(path,"series",k+".npz")) as data:
+        return({name:data[name] for name in data.files})
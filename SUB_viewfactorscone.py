@@ -20,7 +20,10 @@ def fun1(r1,r3,h,absoIC):
     # r3 [m], aperture radius
     # h [m]: cone height
     # absoIC [-], absorptivity inner cavity
-    
+    # all inputs can be arrays (broadcast), e.g. thousands of cavities at once
+
+    r1,r3,h,absoIC = (np.asarray(x,dtype=float) for x in np.broadcast_arrays(r1,r3,h,absoIC))
+
     ### Cone areas
     A1 = np.pi*2*r1*h           #[m2], inner wall surface area
     A2 = np.pi*(r1**2-r3**2)    #[m2], base surface area (without aperture)
@@ -39,32 +42,18 @@ def fun1(r1,r3,h,absoIC):
     F12 = 1-F11-F13
     F21 = 1
     
+    ### Radiation losses, all reflections (radiosity). After k reflections the power leaving the surfaces is
+    # Qout_k = (rho*F^T)^k Qout_0 with rho = 1-absoIC, the sum over all k is (I - rho*F^T)^-1 Qout_0
+    F = np.zeros(r1.shape+(2,2))        #[-], F[i][j] from cavity surface i to j
+    F[...,0,0],F[...,0,1],F[...,1,0] = F11,F12,F21
+    M = np.eye(2)-(1-absoIC)[...,None,None]*np.swapaxes(F,-1,-2)
+
     ### Calculate cone absorption loss
-    Qout1 = 1*(1-absoIC) #all irradiation falls on surface 1
-    Qout2 = 0
-    QlostA = 0
-    
-    for i in range(0,20):
-        QlostA += Qout1*F13
-              
-        Qreflin1 = Qout1*F11+Qout2*F21
-        Qreflin2 = Qout1*F12
+    Qout = np.stack([1*(1-absoIC),0*absoIC],axis=-1) #all irradiation falls on surface 1
+    QlostA = np.linalg.solve(M,Qout[...,None])[...,0,0]*F13
 
-        Qout1 = Qreflin1*(1-absoIC)
-        Qout2 = Qreflin2*(1-absoIC)
-        
     ### Calculate cone emission loss
-    Qout1 = A1/(A1+A2)
-    Qout2 = A2/(A1+A2)
-    QlostE = 0
-    
-    for i in range(0,20):
-        QlostE += Qout1*F13
-              
-        Qreflin1 = Qout1*F11+Qout2*F21
-        Qreflin2 = Qout1*F12
+    Qout = np.stack([A1/(A1+A2),A2/(A1+A2)],axis=-1)
+    QlostE = np.linalg.solve(M,Qout[...,None])[...,0,0]*F13
 
-        Qout1 = Qreflin1*(1-absoIC)
-        Qout2 = Qreflin2*(1-absoIC)
-             
-    return(QlostA,QlostE,F13)
+    return(QlostA[()],QlostE[()],F13[()])
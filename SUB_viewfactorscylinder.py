@@ -21,6 +21,9 @@ def fun1(r1,r4,h,absoIC):
     # r4 [m]: aperture radius
     # h [m]: cylinder height
     # absoIC [-], absorptivity inner cavity
+    # all inputs can be arrays (broadcast), e.g. thousands of cavities at once
+
+    r1,r4,h,absoIC = (np.asarray(x,dtype=float) for x in np.broadcast_arrays(r1,r4,h,absoIC))
 
     ### Cylinder areas
     A1 = np.pi*r1**2            #[m2], bottom surface area
@@ -51,50 +54,33 @@ def fun1(r1,r4,h,absoIC):
     X2 = H2**2+R**2+1
     F24 = 1/(4*R*H2)*(-H2**2-R**2+1+(X2**2-4*R**2)**(1/2))
     
-    #F3-2 (C-83)
-    if r1 == r4:
-        F32 = 0
-    else:
-        R = r1/r4
-        H = h/r4
-        
+    #F3-2 (C-83), 0 if r1 == r4
+    R = r1/r4
+    H = h/r4
+    with np.errstate(divide='ignore',invalid='ignore'):
         F32 = 1/2*(1+1/(R**2-1)*(H*(4*R**2+H**2)**(1/2)-((1+R**2+H**2)**2-4*R**2)**(1/2)))
+    F32 = np.where(r1 == r4,0.0,F32)
         
     #Other (by deduction)
     F13 = 1-F14-F12
     F23 = 1-F21-F22-F24
     F31 = 1-F32
     
-    ### Calculate cylinder absorption loss  
-    Qout1 = A1/(A1+A2)*(1-absoIC)
-    Qout2 = A2/(A1+A2)*(1-absoIC)
-    Qout3 = 0
-    QlostA = 0
-    for i in range(0,20):
-        QlostA += (Qout1*F14+Qout2*F24)
-        
-        Qreflin1 = Qout2*F21+Qout3*F31
-        Qreflin2 = Qout1*F12+Qout2*F22+Qout3*F32
-        Qreflin3 = Qout1*F13+Qout2*F23
-        
-        Qout1 = Qreflin1*(1-absoIC)
-        Qout2 = Qreflin2*(1-absoIC)
-        Qout3 = Qreflin3*(1-absoIC)
+    ### Radiation losses, all reflections (radiosity). After k reflections the power leaving the surfaces is
+    # Qout_k = (rho*F^T)^k Qout_0 with rho = 1-absoIC, the sum over all k is (I - rho*F^T)^-1 Qout_0
+    F = np.zeros(r1.shape+(3,3))        #[-], F[i][j] from cavity surface i to j
+    F[...,0,1],F[...,0,2] = F12,F13
+    F[...,1,0],F[...,1,1],F[...,1,2] = F21,F22,F23
+    F[...,2,0],F[...,2,1] = F31,F32
+    M = np.eye(3)-(1-absoIC)[...,None,None]*np.swapaxes(F,-1,-2)
+    Floss = np.stack([F14,F24,0*F14],axis=-1)   #[-], view factors to the aperture
 
-    ### Calculate cylinder emission loss  
-    Qout1 = A1/(A1+A2+A3)
-    Qout2 = A2/(A1+A2+A3)
-    Qout3 = A3/(A1+A2+A3)
-    QlostE = 0
-    for i in range(0,20):
-        QlostE += (Qout1*F14+Qout2*F24)
-        
-        Qreflin1 = Qout2*F21+Qout3*F31
-        Qreflin2 = Qout1*F12+Qout2*F22+Qout3*F32
-        Qreflin3 = Qout1*F13+Qout2*F23
-        
-        Qout1 = Qreflin1*(1-absoIC)
-        Qout2 = Qreflin2*(1-absoIC)
-        Qout3 = Qreflin3*(1-absoIC)
-        
-    return(QlostA,QlostE)
+    ### Calculate cylinder absorption loss
+    Qout = np.stack([A1/(A1+A2)*(1-absoIC),A2/(A1+A2)*(1-absoIC),0*absoIC],axis=-1)
+    QlostA = np.sum(Floss*np.linalg.solve(M,Qout[...,None])[...,0],axis=-1)
+
+    ### Calculate cylinder emission loss
+    Qout = np.stack([A1/(A1+A2+A3),A2/(A1+A2+A3),A3/(A1+A2+A3)],axis=-1)
+    QlostE = np.sum(Floss*np.linalg.solve(M,Qout[...,None])[...,0],axis=-1)
+
+    return(QlostA[()],QlostE[()])